@@ -0,0 +1,86 @@
+"""
+Tag facet counts of the recipe list.
+
+For every tag, the number of recipes matching the other RecipeFilter
+filters (author, favorites, shopping cart, ids) that have the tag. Tags
+are OR-ed in the list, so selected tags do not narrow the counts: a
+count is how many recipes the tag alone would list.
+
+Counts are cached per filter combination. Recipe creation and deletion,
+tag changes and changes of recipe tags drop all of them; favorites and
+shopping cart changes only drop the counts of their user's filters.
+Counts and generations are kept in FACET_CACHE, the Redis shared by all
+workers, so a change made in one worker drops the counts of every one;
+no database query is made for them. A bump is a single SET of a random
+generation that never expires. A generation that is lost anyway (a
+culled or flushed cache) is replaced by a new random one, so counts are
+computed again, never served from before the loss.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Count, Q
+
+from recipes.models import Tag
+
+from .pagination import count_key
+from .singleflight import single_flight
+
+# filters of RecipeFilter that depend on the user.
+USER_FILTERS = ("is_favorited", "is_in_shopping_cart")
+
+
+def generation_key(user_id=None):
+    return "facets:generation" if user_id is None else (
+        f"facets:generation:{user_id}"
+    )
+
+
+def bump_generation(user_id=None):
+    caches[settings.FACET_CACHE].set(
+        generation_key(user_id), uuid.uuid4().hex, None
+    )
+
+
+def facets_key(recipes, request):
+    keys = [generation_key()]
+    if request.user.is_authenticated and any(
+        name in request.query_params for name in USER_FILTERS
+    ):
+        keys.append(generation_key(request.user.pk))
+    cache = caches[settings.FACET_CACHE]
+    generations = [
+        cache.get_or_set(key, uuid.uuid4().hex, None) for key in keys
+    ]
+    return f"facets:{':'.join(generations)}:{count_key(recipes)}"
+
+
+def tag_counts(recipes):
+    """tags with the number of recipes of the queryset having each."""
+    return list(
+        Tag.objects.values("id", "name", "slug")
+        .annotate(
+            count=Count("recipe", filter=Q(recipe__in=recipes.values("pk")))
+        )
+        .order_by("id")
+    )
+
+
+def tag_facets(recipes, request):
+    """tag_counts of a RecipeFilter queryset filtered without tags."""
+    try:
+        key = facets_key(recipes, request)
+    except EmptyResultSet:
+        # nothing can match: queryset.none() or an empty ids filter.
+        return [
+            {**tag, "count": 0}
+            for tag in Tag.objects.values("id", "name", "slug").order_by("id")
+        ]
+    return single_flight.get(
+        caches[settings.FACET_CACHE],
+        key,
+        lambda: tag_counts(recipes),
+        settings.FACET_CACHE_TIMEOUT,
+    )
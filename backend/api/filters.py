@@ -1,4 +1,4 @@
-from django.db.models import Q
+from django.db.models import Case, F, IntegerField, Q, When
 from django_filters import rest_framework as filters
 from recipes.models import Ingredient, Recipe
 
@@ -13,21 +13,67 @@ class IngredientFilter(filters.FilterSet):
         fields = ("name",)
 
 
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """comma separated list of numbers."""
+
+
+def in_given_order(queryset, ids):
+    """filter queryset by ids and order it as ids are listed."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(
+        Case(
+            *(When(pk=pk, then=position) for position, pk in enumerate(ids)),
+            output_field=IntegerField(),
+        )
+    )
+
+
 class RecipeFilter(filters.FilterSet):
     """filter recipes by author, tags, favorites, shopping_carts fields."""
 
+    ORDERINGS = {
+        "popular": (
+            F("ranking__popular_score").desc(nulls_last=True),
+            "-pub_at",
+        ),
+        "trending": (
+            F("ranking__trending_score").desc(nulls_last=True),
+            "-pub_at",
+        ),
+        "newest": ("-pub_at",),
+        "fastest": ("cooking_time", "-pub_at"),
+    }
+
+    ids = NumberInFilter(method="filter_ids")
     tags = filters.CharFilter(field_name="tags__slug", method="filter_tags")
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(
         method="filter_is_in_shopping_cart"
     )
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in ORDERINGS],
+        method="filter_ordering",
+    )
 
     class Meta:
         model = Recipe
-        fields = ("tags", "is_favorited", "author", "is_in_shopping_cart")
+        fields = (
+            "ids",
+            "tags",
+            "is_favorited",
+            "author",
+            "is_in_shopping_cart",
+            "ordering",
+        )
+
+    def filter_ids(self, queryset, name, value):
+        return in_given_order(queryset, [int(pk) for pk in value])
 
     def filter_tags(self, queryset, name, value):
-        tag_slugs = self.request.query_params.getlist("tags")
+        # sorted, so every order of the same tags is one count_key.
+        tag_slugs = sorted(set(self.request.query_params.getlist("tags")))
         if tag_slugs:
             query = Q(tags__slug=tag_slugs[0])
             for slug in tag_slugs[1:]:
@@ -51,3 +97,6 @@ class RecipeFilter(filters.FilterSet):
         if shopping_cart_list and user.is_authenticated:
             return queryset.filter(cart__user=user)
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
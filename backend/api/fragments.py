@@ -0,0 +1,118 @@
+"""
+Pre-rendered recipe JSON shared by all readers.
+
+A fragment is the RecipeSerializer output of one recipe as an anonymous
+reader sees it, rendered once and kept in RECIPE_FRAGMENT_CACHE under
+the recipe id and Recipe.version. Every change of the recipe, its
+author, tags or ingredients raises the version (recipes.signals), so an
+outdated fragment is never read again and just expires. The three flags
+that depend on the reader are overlaid on the bytes.
+
+The base64 image is most of a recipe's JSON, so fragments are stored
+with "image": null and the image is spliced in when a page is served;
+an entry stays a few kilobytes whatever the image size.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+
+from recipes.models import Recipe
+
+from .readers import image_data, recipe_values, recipes_data, subscribed_to
+from .singleflight import single_flight
+
+# raise when RecipeSerializer output or the cache entry format changes.
+FORMAT = 3
+FLAGS = (b'"is_subscribed":', b'"is_favorited":', b'"is_in_shopping_cart":')
+IMAGE = b'"image":null'
+ANNOTATIONS = ("_is_favorited", "_is_in_shopping_cart")
+
+
+def fragment_key(recipe_id, version):
+    return f"recipe-json:{FORMAT}:{recipe_id}:{version}"
+
+
+def fragment_rows(queryset):
+    """values() queryset with what recipes_json needs per recipe."""
+    return queryset.prefetch_related(None).values(
+        "id",
+        "version",
+        "author_id",
+        "image",
+        *(name for name in ANNOTATIONS if name in queryset.query.annotations),
+    )
+
+
+def get_fragments(rows, renderer):
+    """
+    rendered recipes for fragment_rows, in order.
+
+    misses are built through single_flight, so concurrent requests for
+    the same page render each recipe once.
+    """
+    keys = {row["id"]: fragment_key(row["id"], row["version"]) for row in rows}
+    recipe_ids = {key: recipe_id for recipe_id, key in keys.items()}
+
+    def build(missing):
+        # stored under the version read with the page: if the recipe
+        # changed since, the newer data lands under a key no longer read.
+        return {
+            keys[data["id"]]: renderer.render({**data, "image": None})
+            for data in recipes_data(
+                list(
+                    recipe_values(
+                        Recipe.objects.filter(
+                            pk__in=[recipe_ids[key] for key in missing]
+                        )
+                    )
+                ),
+                AnonymousUser(),
+            )
+        }
+
+    fragments = single_flight.get_many(
+        caches[settings.RECIPE_FRAGMENT_CACHE], list(keys.values()), build
+    )
+    return [fragments.get(keys[row["id"]]) for row in rows]
+
+
+def overlay(fragment, image, *flags):
+    """
+    splice the image file in and set reader-dependent flags, in FLAGS
+    order, on a fragment.
+
+    keys can not occur inside JSON strings (their quotes are escaped),
+    so the first match is the key itself; the author has no image.
+    """
+    data = image_data(image)
+    if data is not None:
+        fragment = fragment.replace(
+            IMAGE, b'"image":' + json.dumps(data).encode(), 1
+        )
+    for name, value in zip(FLAGS, flags):
+        if value:
+            fragment = fragment.replace(name + b"false", name + b"true", 1)
+    return fragment
+
+
+def recipes_json(rows, user, renderer):
+    """JSON array of recipes for fragment_rows as seen by user."""
+    subscribed = subscribed_to(user, {row["author_id"] for row in rows})
+    return (
+        b"["
+        + b",".join(
+            overlay(
+                fragment,
+                row["image"],
+                row["author_id"] in subscribed,
+                row.get("_is_favorited", False),
+                row.get("_is_in_shopping_cart", False),
+            )
+            for row, fragment in zip(rows, get_fragments(rows, renderer))
+            # deleted after the page was read.
+            if fragment is not None
+        )
+        + b"]"
+    )
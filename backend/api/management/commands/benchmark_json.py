@@ -0,0 +1,48 @@
+import io
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+from api.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare stdlib and orjson rendering of RecipeSerializer pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=6)
+        parser.add_argument("--number", type=int, default=200)
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get("/api/recipes/"))
+        request.user = AnonymousUser()
+        recipes = Recipe.objects.all()[: options["page_size"]]
+        data = RecipeSerializer(
+            recipes, many=True, context={"request": request}
+        ).data
+        number = options["number"]
+
+        for name, renderer, parser in (
+            ("json", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+        ):
+            body = renderer.render(data)
+            render_time = timeit.timeit(
+                lambda: renderer.render(data), number=number
+            )
+            parse_time = timeit.timeit(
+                lambda: parser.parse(io.BytesIO(body)), number=number
+            )
+            self.stdout.write(
+                f"{name:>6}: {len(data)} recipes, {len(body)} bytes, "
+                f"render {render_time / number * 1000:.3f} ms/page, "
+                f"parse {parse_time / number * 1000:.3f} ms/page"
+            )
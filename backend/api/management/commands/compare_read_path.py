@@ -0,0 +1,309 @@
+import json
+import random
+import shutil
+import tempfile
+import timeit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.urls import resolve
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Subscription, Tag,
+                            User)
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api import sql_json
+
+RECIPE_QUERIES = (
+    "",
+    "?page=2",
+    "?limit=20",
+    "?view=card",
+    "?fields=id,name,tags",
+    "?fields=author,is_favorited",
+    "?omit=text,ingredients",
+    "?fields=",
+    "?is_favorited=1",
+    "?is_in_shopping_cart=1",
+    "?tags={tag}",
+)
+SUBSCRIPTION_QUERIES = ("", "?recipes_limit=2", "?page=2&limit=3")
+MODES = {
+    "serializer": {"FAST_READ_PATH": False, "RECIPE_FRAGMENTS": False},
+    "values": {"FAST_READ_PATH": True, "RECIPE_FRAGMENTS": False},
+    "fragments": {"RECIPE_FRAGMENTS": True},
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the values() read path and recipe fragments render "
+        "the same bytes as the serializers on generated data, and time "
+        "them. Runs in a transaction that is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=200)
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--number", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        media_root = tempfile.mkdtemp()
+        # fragments of rolled back recipes must not outlive the command;
+        # the shared cache is a table, rolled back with the rest.
+        caches = {
+            **settings.CACHES,
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "compare-read-path",
+            }
+        }
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                CACHES=caches,
+                RECIPE_FRAGMENT_CACHE="default",
+            ):
+                with transaction.atomic():
+                    self.compare(options)
+                    raise Rollback
+        except Rollback:
+            pass
+        finally:
+            shutil.rmtree(media_root)
+
+    def compare(self, options):
+        rng = random.Random(options["seed"])
+        users = self.generate(rng, options["users"], options["recipes"])
+        reader = users[0]
+        # the newest recipe is on every first page, so its changes show.
+        recipe = Recipe.objects.first()
+        tag = Tag.objects.filter(slug__startswith="read-path-").first()
+
+        cases = [
+            (user, f"/api/recipes/{query.format(tag=tag.slug)}")
+            for user in (None, reader)
+            for query in RECIPE_QUERIES
+        ]
+        cases += [
+            (None, f"/api/recipes/{recipe.pk}/"),
+            (reader, f"/api/recipes/{recipe.pk}/?view=card"),
+            (reader, "/api/recipes/0/"),
+            (None, "/api/tags/"),
+            (None, f"/api/tags/{tag.pk}/"),
+            (None, "/api/ingredients/?name=ing"),
+            (None, "/api/ingredients/0/"),
+        ]
+        cases += [
+            (reader, f"/api/users/subscriptions/{query}")
+            for query in SUBSCRIPTION_QUERIES
+        ]
+
+        self.check_identical(cases)
+        self.change(rng, recipe)
+        self.check_identical(cases)
+        if sql_json.is_supported():
+            self.compare_db_json(
+                [path for user, path in cases if user is None]
+            )
+
+        number = options["number"]
+        for user, path in (
+            (None, "/api/recipes/"),
+            (None, "/api/recipes/?limit=20"),
+            (reader, "/api/recipes/?limit=20"),
+            (reader, "/api/recipes/?limit=20&view=card"),
+            (None, "/api/ingredients/?name=ing"),
+            (reader, "/api/users/subscriptions/"),
+        ):
+            modes = dict(MODES)
+            if self.is_recipe_list(path) and user is None and (
+                sql_json.is_supported()
+            ):
+                modes["db json"] = {"RECIPE_LIST_DB_JSON": True}
+            times = {
+                name: timeit.timeit(
+                    lambda: self.get(user, path, **overrides), number=number
+                )
+                / number
+                * 1000
+                for name, overrides in modes.items()
+            }
+            self.stdout.write(
+                f"{'anonymous' if user is None else 'user':<10}{path:<35} "
+                + ", ".join(
+                    f"{name} {time:7.2f} ms "
+                    f"({times['serializer'] / time:.1f}x)"
+                    for name, time in times.items()
+                )
+            )
+
+    def check_identical(self, cases):
+        """every mode, fragments cold and warm, against the serializers."""
+        mismatches = []
+        for user, path in cases:
+            expected = self.get(user, path, **MODES["serializer"])
+            for name in ("values", "fragments", "fragments"):
+                actual = self.get(user, path, **MODES[name])
+                if actual != expected:
+                    mismatches.append(path)
+                    self.report(name, path, expected, actual)
+        if mismatches:
+            raise CommandError(
+                f"{len(mismatches)} of {len(cases) * 3} responses differ"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(cases) * 3} responses byte-identical")
+        )
+
+    def report(self, name, path, expected, actual):
+        at = next(
+            (
+                index
+                for index, (a, b) in enumerate(zip(expected[1], actual[1]))
+                if a != b
+            ),
+            min(len(expected[1]), len(actual[1])),
+        )
+        self.stderr.write(
+            f"{name} {path} ({expected[0]}/{actual[0]}) "
+            f"differ at byte {at}:\n"
+            f"  {expected[1][max(at - 80, 0):at + 80]}\n"
+            f"  {actual[1][max(at - 80, 0):at + 80]}"
+        )
+
+    def change(self, rng, recipe):
+        """edit everything a cached fragment of recipe is built from."""
+        recipe.name += " (изменён)"
+        recipe.save()
+        recipe.tags.add(Tag.objects.exclude(recipe=recipe).first())
+        item = recipe.recipeingredient_set.first()
+        item.amount += 1
+        item.save()
+        ingredient = recipe.ingredients.last()
+        ingredient.name += " (переименован)"
+        ingredient.save()
+        tag = recipe.tags.first()
+        tag.name += "!"
+        tag.save()
+        author = recipe.author
+        author.first_name = "Другое имя"
+        author.save()
+        self.stdout.write(f"changed recipe {recipe.pk} and its relations")
+
+    def compare_db_json(self, paths):
+        """DB-built JSON differs in whitespace only, so parsed is compared."""
+        paths = [path for path in paths if self.is_recipe_list(path)]
+        mismatches = []
+        for path in paths:
+            expected = self.get(None, path, **MODES["serializer"])
+            actual = self.get(None, path, RECIPE_LIST_DB_JSON=True)
+            if expected[0] != actual[0] or (
+                json.loads(expected[1]) != json.loads(actual[1])
+            ):
+                mismatches.append(path)
+                self.stderr.write(f"{path}\n  {actual[1][:300]}")
+        if mismatches:
+            raise CommandError(
+                f"{len(mismatches)} of {len(paths)} RECIPE_LIST_DB_JSON "
+                "responses differ"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(paths)} RECIPE_LIST_DB_JSON responses equal"
+            )
+        )
+
+    def generate(self, rng, user_count, recipe_count):
+        # existing images are not in the temporary MEDIA_ROOT; the
+        # deletion is rolled back with everything else.
+        Recipe.objects.all().delete()
+        users = [
+            User.objects.create_user(
+                username=f"read_path_{index}",
+                email=f"read_path_{index}@example.com",
+                password="read-path",
+                first_name=f"Имя {index}",
+                last_name=f"Фамилия {index}",
+            )
+            for index in range(user_count)
+        ]
+        for user in users[::3]:
+            user.avatar.save(
+                f"{user.username}.png", ContentFile(b"avatar"), save=True
+            )
+        tags = [
+            Tag.objects.create(name=f"Тег {index}", slug=f"read-path-{index}")
+            for index in range(5)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"ingredient {index}", measurement_unit="г")
+            for index in range(50)
+        )
+        # sqlite does not return pks from bulk_create.
+        ingredients = list(
+            Ingredient.objects.filter(name__startswith="ingredient ")
+        )
+        recipes = []
+        for index in range(recipe_count):
+            recipe = Recipe(
+                author=rng.choice(users),
+                name=f"Рецепт «{index}»",
+                text="Шаг 1.\nШаг 2: \"готово\"" * rng.randint(1, 5),
+                cooking_time=rng.randint(1, 240),
+            )
+            recipe.image.save(
+                f"read-path-{index}.jpg",
+                ContentFile(rng.randbytes(rng.randint(10, 200))),
+                save=True,
+            )
+            recipe.tags.set(rng.sample(tags, rng.randint(1, 3)))
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient,
+                    amount=rng.randint(1, 1000),
+                )
+                for ingredient in rng.sample(ingredients, rng.randint(1, 8))
+            )
+            recipes.append(recipe)
+        reader = users[0]
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=reader, recipe=recipe)
+            for recipe in rng.sample(recipes, len(recipes) // 4)
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=reader, recipe=recipe)
+            for recipe in rng.sample(recipes, len(recipes) // 5)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=reader, following=user) for user in users[1:]
+        )
+        return users
+
+    def is_recipe_list(self, path):
+        return resolve(path.split("?")[0]).url_name == "recipes-list"
+
+    def get(self, user, path, **overrides):
+        request = self.factory.get(path)
+        if user is not None:
+            force_authenticate(request, user=user)
+        match = resolve(request.path_info)
+        view = match.func.cls.as_view(
+            match.func.actions, **match.func.initkwargs, throttle_classes=()
+        )
+        with override_settings(**overrides):
+            response = view(request, *match.args, **match.kwargs)
+            if response.streaming:
+                return response.status_code, b"".join(response)
+            if hasattr(response, "render"):
+                response.render()
+        return response.status_code, response.content
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+TARGETS = {
+    "check": ["manage.py", "check"],
+    "wsgi": ["-c", "import foodgram.wsgi"],
+}
+
+
+def parse_importtime(output):
+    """yield (module, self_us, cumulative_us) from python -X importtime."""
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        yield name.strip(), int(self_us), int(cumulative_us)
+
+
+def measure(target):
+    """(module, self_us, cumulative_us) of one cold start of a target."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *TARGETS[target]],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise CommandError(f"{target} failed:\n{result.stderr}")
+    return list(parse_importtime(result.stderr))
+
+
+def fastest(target, repeat):
+    """measure() of the run with the least total self time."""
+    return min(
+        (measure(target) for _ in range(repeat)),
+        key=lambda modules: sum(self_us for _, self_us, _ in modules),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start import time of manage.py check and WSGI app "
+        "creation with python -X importtime"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "targets",
+            nargs="*",
+            help=f"What to measure: {', '.join(TARGETS)} (default: all)",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=15,
+            help="Number of packages and modules to list",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per target; the fastest one is reported",
+        )
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            help="Fail if total import time of a target exceeds this",
+        )
+
+    def handle(self, *args, **options):
+        targets = options["targets"] or list(TARGETS)
+        unknown = set(targets) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(unknown)}")
+        over_budget = []
+        for target in targets:
+            modules = fastest(target, options["repeat"])
+            total = self._report(target, modules, options["top"])
+            if options["budget_ms"] and total > options["budget_ms"]:
+                over_budget.append(f"{target} {total:.0f} ms")
+        if over_budget:
+            raise CommandError(
+                f"Import time over budget of {options['budget_ms']:.0f} ms: "
+                + ", ".join(over_budget)
+            )
+
+    def _report(self, target, modules, top):
+        packages = defaultdict(lambda: [0, 0])
+        for name, self_us, _ in modules:
+            package = packages[name.split(".")[0]]
+            package[0] += self_us
+            package[1] += 1
+        total = sum(self_us for _, self_us, _ in modules) / 1000
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"{target}: {len(modules)} modules, {total:.0f} ms"
+            )
+        )
+        self.stdout.write("  packages (self time):")
+        for package, (self_us, count) in sorted(
+            packages.items(), key=lambda item: -item[1][0]
+        )[:top]:
+            self.stdout.write(
+                f"  {self_us / 1000:8.1f} ms {count:5} modules  {package}"
+            )
+        self.stdout.write("  modules (self time):")
+        for name, self_us, _ in sorted(modules, key=lambda item: -item[1])[
+            :top
+        ]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {name}")
+        return total
@@ -0,0 +1,183 @@
+import asyncio
+import resource
+import statistics
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import Recipe, Subscription, User
+from rest_framework.authtoken.models import Token
+
+from foodgram.events import PATH
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many concurrent /api/events/recipes/ streams against a "
+        "running ASGI server, publish recipes of the author they follow "
+        "and report delivery and latency. Users it creates are deleted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8001")
+        parser.add_argument("--subscribers", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10)
+        parser.add_argument("--interval", type=float, default=0.5)
+        parser.add_argument("--connect-concurrency", type=int, default=200)
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        self.host, self.port = url.hostname, url.port or 80
+        self.raise_open_files(options["subscribers"] + 100)
+        prefix = f"sse-{uuid.uuid4().hex[:8]}"
+        try:
+            self.author, keys = self.generate(prefix, options["subscribers"])
+            asyncio.run(self.run(keys, options))
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def raise_open_files(self, needed):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < needed:
+            if hard != resource.RLIM_INFINITY and hard < needed:
+                raise CommandError(
+                    f"{needed} open files needed, the hard limit is {hard}"
+                )
+            resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+    def generate(self, prefix, count):
+        """author and token keys of count users following it."""
+        User.objects.bulk_create(
+            User(
+                username=f"{prefix}-{index}",
+                email=f"{prefix}-{index}@example.com",
+                first_name="SSE",
+                last_name=str(index),
+            )
+            for index in range(count + 1)
+        )
+        users = list(
+            User.objects.filter(username__startswith=prefix).order_by("id")
+        )
+        author, subscribers = users[0], users[1:]
+        Subscription.objects.bulk_create(
+            Subscription(user=user, following=author) for user in subscribers
+        )
+        tokens = Token.objects.bulk_create(
+            Token(key=Token.generate_key(), user=user) for user in subscribers
+        )
+        self.stdout.write(f"{count} users follow {author.username}")
+        return author, [token.key for token in tokens]
+
+    async def run(self, keys, options):
+        self.published = {}
+        self.received = []
+        writes = []
+        semaphore = asyncio.Semaphore(options["connect_concurrency"])
+
+        started = time.monotonic()
+        connected = await asyncio.gather(
+            *(self.connect(semaphore, key) for key in keys),
+            return_exceptions=True,
+        )
+        streams = [stream for stream in connected if isinstance(stream, tuple)]
+        failed = len(connected) - len(streams)
+        self.stdout.write(
+            f"{len(streams)} streams open in "
+            f"{time.monotonic() - started:.2f} s, {failed} failed"
+        )
+        if not streams:
+            raise CommandError("no stream could be opened")
+
+        readers = [
+            asyncio.ensure_future(self.read(reader)) for reader, _ in streams
+        ]
+        expected = len(streams) * options["recipes"]
+        for index in range(options["recipes"]):
+            sent = time.monotonic()
+            recipe_id = await sync_to_async(self.publish)(index)
+            self.published[recipe_id] = sent
+            writes.append(time.monotonic() - sent)
+            await asyncio.sleep(options["interval"])
+
+        deadline = time.monotonic() + options["timeout"]
+        while len(self.received) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for task in readers:
+            task.cancel()
+        for _, writer in streams:
+            writer.close()
+
+        self.stdout.write(
+            f"recipe writes: median {statistics.median(writes) * 1000:.1f} ms"
+        )
+        self.report(expected)
+
+    async def connect(self, semaphore, key):
+        async with semaphore:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            writer.write(
+                (
+                    f"GET {PATH} HTTP/1.1\r\n"
+                    f"Host: {self.host}\r\n"
+                    f"Authorization: Token {key}\r\n"
+                    "Accept: text/event-stream\r\n\r\n"
+                ).encode()
+            )
+            await writer.drain()
+            status = await reader.readline()
+            if b" 200 " not in status:
+                writer.close()
+                raise CommandError(status.decode().strip())
+            while (await reader.readline()).strip():
+                pass
+            return reader, writer
+
+    async def read(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"id: "):
+                # the event may arrive before publish() returns its id.
+                self.received.append((int(line[4:]), time.monotonic()))
+
+    @transaction.atomic
+    def publish(self, index):
+        """create a recipe the way the API does, NOTIFY sent on commit."""
+        return Recipe.objects.create(
+            author=self.author,
+            name=f"SSE {index}",
+            image="recipes/images/sse.png",
+            text="SSE",
+            cooking_time=1,
+        ).pk
+
+    def report(self, expected):
+        latencies = sorted(
+            received - self.published[recipe_id]
+            for recipe_id, received in self.received
+            if recipe_id in self.published
+        )
+        line = (
+            f"{len(latencies)} of {expected} events delivered, "
+            "from the start of the write"
+        )
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100)
+            line += (
+                f": latency p50 {percentiles[49] * 1000:.1f} ms, "
+                f"p99 {percentiles[98] * 1000:.1f} ms, "
+                f"max {latencies[-1] * 1000:.1f} ms"
+            )
+        style = (
+            self.style.SUCCESS if len(latencies) == expected
+            else self.style.ERROR
+        )
+        self.stdout.write(style(line))
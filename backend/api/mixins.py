@@ -1,9 +1,126 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
 
 from .pagination import PageNumberPaginationDataOnly
+from .singleflight import single_flight
+
+
+def reference_generation_key(basename):
+    return f"reference:{basename}:generation"
+
+
+def reference_key(basename, params):
+    """cache key of a tag / ingredient list page, dropped on any change."""
+    generation = caches[settings.REFERENCE_CACHE].get_or_set(
+        reference_generation_key(basename), uuid.uuid4().hex, None
+    )
+    digest = hashlib.sha1(params.encode()).hexdigest()
+    return f"reference:{basename}:{generation}:{digest}"
+
+
+def bump_reference_generation(basename):
+    caches[settings.REFERENCE_CACHE].set(
+        reference_generation_key(basename), uuid.uuid4().hex, None
+    )
 
 
 class DefaultIngredientTagMixin(viewsets.ReadOnlyModelViewSet):
-    """add same pagination for ingredient and tags."""
+    """
+    add same pagination for ingredient and tags.
+
+    their serializers only have plain model fields, so reads are served
+    from values() rows when FAST_READ_PATH is on, and list pages are
+    cached in REFERENCE_CACHE.
+    """
 
     pagination_class = PageNumberPaginationDataOnly
+
+    def get_values_queryset(self):
+        fields = self.get_serializer_class().Meta.fields
+        return self.filter_queryset(self.get_queryset()).values(*fields)
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_PATH:
+            return super().list(request, *args, **kwargs)
+        # the paginator returns the bare page, so it is the whole response.
+        return Response(
+            single_flight.get(
+                caches[settings.REFERENCE_CACHE],
+                reference_key(self.basename, request.query_params.urlencode()),
+                self.list_values,
+                settings.REFERENCE_CACHE_TIMEOUT,
+            )
+        )
+
+    def list_values(self):
+        queryset = self.get_values_queryset()
+        page = self.paginate_queryset(queryset)
+        return list(queryset) if page is None else page
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.FAST_READ_PATH:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(
+            get_object_or_404(
+                self.get_values_queryset(),
+                pk=kwargs[self.lookup_url_kwarg or self.lookup_field],
+            )
+        )
+
+
+class SparseFieldsetMixin:
+    """
+    fields=, omit= and view= query params for read actions.
+
+    requested fields are passed to the serializer context and can be used
+    by get_queryset to skip joins, prefetches and columns.
+    """
+
+    sparse_actions = ("list", "retrieve")
+    field_presets = {}
+
+    def get_requested_fields(self):
+        """return tuple of output fields or None when nothing is pruned."""
+        if hasattr(self, "_requested_fields"):
+            return self._requested_fields
+
+        self._requested_fields = None
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or not any(
+            key in params for key in ("fields", "omit", "view")
+        ):
+            return None
+
+        fields = self.get_serializer_class().Meta.fields
+        view = params.get("view")
+        if view is not None:
+            if view not in self.field_presets:
+                raise ValidationError(
+                    {"view": f"Неизвестное представление: {view}."}
+                )
+            fields = self.field_presets[view]
+        if "fields" in params:
+            requested = set(params["fields"].split(","))
+            fields = tuple(field for field in fields if field in requested)
+        if "omit" in params:
+            omitted = set(params["omit"].split(","))
+            fields = tuple(field for field in fields if field not in omitted)
+
+        self._requested_fields = fields
+        return fields
+
+    def wants_field(self, name):
+        fields = self.get_requested_fields()
+        return fields is None or name in fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = self.get_requested_fields()
+        return context
@@ -1,13 +1,200 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
+from .singleflight import single_flight
+
+COUNT_EXACT_HEADER = "X-Count-Exact"
+
+
+def count_key(queryset):
+    """
+    cache key of the rows a queryset filters, whatever their order.
+
+    built from the SQL of the pk query, so two requests share a count
+    when their filters (and the user they depend on) are the same.
+    """
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    digest = hashlib.sha1(f"{sql}\n{params!r}".encode()).hexdigest()
+    return f"count:{queryset.db}:{digest}"
+
+
+def table_estimate(connection, table):
+    """
+    pg_class.reltuples of a table, cached per PAGINATION_COUNT_TIMEOUT.
+
+    VACUUM / ANALYZE refresh it far less often than that, and a cached
+    small table costs its lists no extra query.
+    """
+    cache = caches[settings.PAGINATION_COUNT_CACHE]
+    key = f"estimate:{connection.alias}:{table}"
+    estimate = cache.get(key)
+    if estimate is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(table)],
+            )
+            row = cursor.fetchone()
+        estimate = -1 if row is None else int(row[0])
+        cache.set(key, estimate, settings.PAGINATION_COUNT_TIMEOUT)
+    return estimate
+
+
+def estimated_count(queryset):
+    """
+    planner estimate of an unfiltered PostgreSQL table, or None.
+
+    pg_class.reltuples is kept by VACUUM / ANALYZE, so it is only used
+    for tables of at least PAGINATION_ESTIMATE_MIN rows, where a COUNT
+    costs the most and a small error does not show.
+    """
+    query = queryset.query
+    connection = connections[queryset.db]
+    if (
+        connection.vendor != "postgresql"
+        or query.has_filters()
+        or query.distinct
+        or query.is_sliced
+        or query.combinator
+        or query.group_by is not None
+    ):
+        return None
+    estimate = table_estimate(connection, queryset.model._meta.db_table)
+    # -1 (or 0 before 14) when the table was never analyzed.
+    if estimate < settings.PAGINATION_ESTIMATE_MIN:
+        return None
+    return estimate
+
+
+def count_rows(queryset):
+    """
+    (count, exact) of a queryset.
+
+    exact counts of at least PAGINATION_COUNT_CACHE_MIN rows are cached
+    for PAGINATION_COUNT_TIMEOUT seconds per count_key, so they may lag
+    behind by that long; smaller ones are cheap and counted every time.
+    """
+    if queryset.query.is_empty():
+        return 0, True
+    estimate = estimated_count(queryset)
+    if estimate is not None:
+        return estimate, False
+    try:
+        key = count_key(queryset)
+    except EmptyResultSet:
+        return 0, True
+    counted = {}
+
+    def count(keys):
+        counted["count"] = queryset.count()
+        if counted["count"] < settings.PAGINATION_COUNT_CACHE_MIN:
+            return {}
+        return {key: counted["count"]}
+
+    cached = single_flight.get_many(
+        caches[settings.PAGINATION_COUNT_CACHE],
+        [key],
+        count,
+        settings.PAGINATION_COUNT_TIMEOUT,
+    )
+    if key in cached:
+        return cached[key], True
+    if "count" not in counted:
+        # another request counted it and found it too small to cache.
+        counted["count"] = queryset.count()
+    return counted["count"], True
+
+
+class EstimatedCountPage(Page):
+    """page of an estimated count, whose next page was looked for."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator counting querysets with count_rows.
+
+    an estimated count is only reported: it bounds no page number, and
+    whether a next page exists is known from fetching one row more.
+    """
+
+    @cached_property
+    def _count(self):
+        if isinstance(self.object_list, QuerySet):
+            return count_rows(self.object_list)
+        return len(self.object_list), True
+
+    @cached_property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def count_exact(self):
+        return self._count[1]
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # raised past the last page too; int() already succeeded.
+            if self.count_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        if self.count_exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        return EstimatedCountPage(
+            rows[:self.per_page], number, self, len(rows) > self.per_page
+        )
+
+
+class CachedCountPagination(PageNumberPagination):
+    """
+    page number pagination with cached and estimated counts.
+
+    whether the count is exact is sent in the X-Count-Exact header. an
+    estimate bounds no page: next links follow the rows actually found,
+    and pages past the end are empty instead of 404.
+    """
+
+    django_paginator_class = CachedCountPaginator
+
+    def get_count_headers(self):
+        exact = self.page.paginator.count_exact
+        return {COUNT_EXACT_HEADER: "true" if exact else "false"}
 
-class PageNumberPaginationDataOnly(PageNumberPagination):
+    def get_paginated_response(self, data):
+        return Response(
+            super().get_paginated_response(data).data,
+            headers=self.get_count_headers(),
+        )
+
+
+class PageNumberPaginationDataOnly(CachedCountPagination):
     def get_paginated_response(self, data):
         return Response(data)
 
 
-class UserSubscriptionPagination(PageNumberPagination):
+class UserSubscriptionPagination(CachedCountPagination):
     """custom pagination for user and subs."""
 
     page_size = 10
@@ -15,8 +202,17 @@ class UserSubscriptionPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class PageLimitPagination(PageNumberPagination):
+class PageLimitPagination(CachedCountPagination):
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 100
     page_query_param = "page"
+
+
+class FeedPagination(CursorPagination):
+    """keyset pagination over feed_pub_at annotation, ties by id."""
+
+    page_size = 6
+    page_size_query_param = "limit"
+    max_page_size = 100
+    ordering = ("-feed_pub_at", "-id")
@@ -0,0 +1,191 @@
+"""
+Read-only output built from values() rows instead of ModelSerializer.
+
+Every function here returns the same data as the serializer named in its
+docstring, key order included, so the rendered JSON is byte-identical
+(checked by the compare_read_path command). Only plain dicts, lists and
+scalars are built; relations are loaded with one query per relation for
+the whole page.
+"""
+import base64
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db.models import Count, OuterRef, Subquery
+
+from recipes.models import Recipe, RecipeIngredient, Subscription, Tag, User
+
+from .serializers import RecipeSerializer, UserWithRecipesSerializer
+
+RECIPE_FIELDS = RecipeSerializer.Meta.fields
+RECIPE_COLUMNS = ("id", "name", "image", "text", "cooking_time")
+AUTHOR_COLUMNS = ("id", "email", "username", "first_name", "last_name")
+USER_WITH_RECIPES_FIELDS = UserWithRecipesSerializer.Meta.fields
+
+
+def image_data(name):
+    """Base64ImageField.to_representation for a stored file name."""
+    if not name:
+        return None
+    with open(default_storage.path(name), "rb") as image_file:
+        return (
+            "data:image/jpeg;base64,"
+            + base64.b64encode(image_file.read()).decode()
+        )
+
+
+def subscribed_to(user, author_ids):
+    if not user.is_authenticated or not author_ids:
+        return set()
+    return set(
+        Subscription.objects.filter(
+            user=user, following__in=author_ids
+        ).values_list("following", flat=True)
+    )
+
+
+def recipe_values(queryset, fields=None):
+    """
+    values() queryset with the columns recipes_data needs.
+
+    the _is_favorited / _is_in_shopping_cart annotations added by
+    RecipeViewSet.get_queryset are kept when present.
+    """
+    fields = set(RECIPE_FIELDS if fields is None else fields)
+    columns = ["id", "author_id"]
+    columns += [column for column in RECIPE_COLUMNS[1:] if column in fields]
+    if "author" in fields:
+        columns += [
+            f"author__{column}" for column in (*AUTHOR_COLUMNS, "avatar")
+        ]
+    columns += [
+        name
+        for name in ("_is_favorited", "_is_in_shopping_cart")
+        if name in queryset.query.annotations and name[1:] in fields
+    ]
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def recipes_data(rows, user, fields=None):
+    """RecipeSerializer(many=True).data for rows of recipe_values."""
+    if fields is None:
+        fields = RECIPE_FIELDS
+    else:
+        requested = set(fields)
+        fields = tuple(name for name in RECIPE_FIELDS if name in requested)
+    recipe_ids = [row["id"] for row in rows]
+
+    tags = defaultdict(list)
+    if "tags" in fields and recipe_ids:
+        for recipe_id, tag_id, name, slug in Tag.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list("recipe", "id", "name", "slug"):
+            tags[recipe_id].append({"id": tag_id, "name": name, "slug": slug})
+
+    ingredients = defaultdict(list)
+    if "ingredients" in fields and recipe_ids:
+        for recipe_id, ingredient_id, name, unit, amount in (
+            RecipeIngredient.objects.filter(recipe__in=recipe_ids)
+            .values_list(
+                "recipe",
+                "ingredient__id",
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                "amount",
+            )
+        ):
+            ingredients[recipe_id].append(
+                {
+                    "id": ingredient_id,
+                    "name": name,
+                    "measurement_unit": unit,
+                    "amount": amount,
+                }
+            )
+
+    subscribed = set()
+    if "author" in fields:
+        subscribed = subscribed_to(user, {row["author_id"] for row in rows})
+
+    builders = {
+        "id": lambda row: row["id"],
+        "author": lambda row: {
+            **{column: row[f"author__{column}"] for column in AUTHOR_COLUMNS},
+            "is_subscribed": row["author_id"] in subscribed,
+            "avatar": (
+                default_storage.url(row["author__avatar"])
+                if row["author__avatar"]
+                else None
+            ),
+        },
+        "name": lambda row: row["name"],
+        "image": lambda row: image_data(row["image"]),
+        "text": lambda row: row["text"],
+        "ingredients": lambda row: ingredients[row["id"]],
+        "tags": lambda row: tags[row["id"]],
+        "cooking_time": lambda row: row["cooking_time"],
+        "is_favorited": lambda row: row.get("_is_favorited", False),
+        "is_in_shopping_cart": (
+            lambda row: row.get("_is_in_shopping_cart", False)
+        ),
+    }
+    accessors = [(name, builders[name]) for name in fields]
+    return [
+        {name: accessor(row) for name, accessor in accessors} for row in rows
+    ]
+
+
+def users_with_recipes_data(author_ids, request):
+    """UserWithRecipesSerializer(many=True).data for users in given order."""
+    users = {
+        row["id"]: row
+        for row in User.objects.filter(pk__in=author_ids).values(
+            *AUTHOR_COLUMNS, "avatar"
+        )
+    }
+    subscribed = subscribed_to(request.user, author_ids)
+    counts = dict(
+        Recipe.objects.filter(author__in=author_ids)
+        .order_by()
+        .values_list("author")
+        .annotate(count=Count("id"))
+    )
+
+    recipes = Recipe.objects.filter(author__in=author_ids)
+    recipes_limit = request.query_params.get("recipes_limit")
+    if recipes_limit:
+        latest = Recipe.objects.filter(author=OuterRef("author")).values(
+            "id"
+        )[: int(recipes_limit)]
+        recipes = recipes.filter(id__in=Subquery(latest))
+    mini = defaultdict(list)
+    for author_id, recipe_id, name, image, cooking_time in (
+        recipes.values_list("author", "id", "name", "image", "cooking_time")
+    ):
+        mini[author_id].append(
+            {
+                "id": recipe_id,
+                "name": name,
+                "image": image_data(image),
+                "cooking_time": cooking_time,
+            }
+        )
+
+    data = []
+    for author_id in author_ids:
+        user = users[author_id]
+        values = {
+            **{column: user[column] for column in AUTHOR_COLUMNS},
+            "is_subscribed": author_id in subscribed,
+            "recipes": mini[author_id],
+            "recipes_count": counts.get(author_id, 0),
+            "avatar": (
+                request.build_absolute_uri(
+                    default_storage.url(user["avatar"])
+                )
+                if user["avatar"]
+                else None
+            ),
+        }
+        data.append({name: values[name] for name in USER_WITH_RECIPES_FIELDS})
+    return data
@@ -1,12 +1,15 @@
 import base64
+import hashlib
 import re
 
 from django.contrib.auth import authenticate, get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
 from rest_framework import serializers
 
 from recipes.models import (MAX_LENGTH_NAME, Ingredient, Recipe,
                             RecipeIngredient, Tag)
+from recipes.similarity import similarity_index
 
 User = get_user_model()
 
@@ -15,6 +18,8 @@ class FavoriteAndShoppingCartMixin:
     """Mixin for is_favorited and is_in_shopping_cart fields."""
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "_is_favorited"):
+            return obj._is_favorited
         user = self.context["request"].user
         return (
             user.is_authenticated
@@ -22,6 +27,8 @@ class FavoriteAndShoppingCartMixin:
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "_is_in_shopping_cart"):
+            return obj._is_in_shopping_cart
         user = self.context["request"].user
         return (
             user.is_authenticated
@@ -29,6 +36,17 @@ class FavoriteAndShoppingCartMixin:
         )
 
 
+class SparseFieldsMixin:
+    """Mixin that drops fields missing from context["fields"]."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class IsSubscribedMixin:
     """Mixin for is_subscribed field."""
 
@@ -46,7 +64,10 @@ class Base64ImageField(serializers.ImageField):
         if isinstance(data, str) and data.startswith("data:image"):
             format, imgstr = data.split(";base64,")
             ext = format.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+            content = base64.b64decode(imgstr)
+            # content-hash names let the media view mark files immutable.
+            name = hashlib.sha256(content).hexdigest()[:16]
+            data = ContentFile(content, name=f"{name}.{ext}")
 
         return super().to_internal_value(data)
 
@@ -164,7 +185,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class UserWithSubscriptionsSerializer(
-    serializers.ModelSerializer, IsSubscribedMixin
+    SparseFieldsMixin, serializers.ModelSerializer, IsSubscribedMixin
 ):
     """User with his subscriptions serializer."""
 
@@ -248,7 +269,9 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipeSerializer(
-    serializers.ModelSerializer, FavoriteAndShoppingCartMixin
+    SparseFieldsMixin,
+    serializers.ModelSerializer,
+    FavoriteAndShoppingCartMixin,
 ):
     """Full Recipe serializer for read."""
 
@@ -323,6 +346,7 @@ class RecipeCreateUpdateSerializer(
             RecipeIngredient.objects.create(
                 recipe=recipe, ingredient=ingredient, amount=amount
             )
+        self._update_similarity(recipe)
         return recipe
 
     def update(self, instance, validated_data):
@@ -352,6 +376,7 @@ class RecipeCreateUpdateSerializer(
                 )
 
         instance.save()
+        self._update_similarity(instance)
         return instance
 
     def to_representation(self, instance):
@@ -368,6 +393,11 @@ class RecipeCreateUpdateSerializer(
             )
         return value
 
+    def _update_similarity(self, recipe):
+        # read back after commit: a partial update may omit tags or
+        # ingredients, and the index must match what was saved.
+        transaction.on_commit(lambda: similarity_index.update_saved(recipe.id))
+
     def _validate_tags_ingredients_data(self, ingredients_data, tags_data):
         if ingredients_data is None:
             raise serializers.ValidationError(
@@ -404,3 +434,30 @@ class RecipeCreateUpdateSerializer(
                         )
                     }
                 )
+
+
+class WhatCanICookSerializer(serializers.Serializer):
+    """Query params of what_can_i_cook search."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=6)
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """List of recipe ids for batch actions."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
+class SyncParamsSerializer(serializers.Serializer):
+    """Query params of /api/sync/."""
+
+    since = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=500)
@@ -0,0 +1,42 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
+                            Tag)
+
+from .facets import bump_generation
+from .mixins import bump_reference_generation
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_reference_generation("tags")
+    bump_generation()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    bump_reference_generation("ingredients")
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, created, **kwargs):
+    if created:
+        bump_generation()
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, **kwargs):
+    bump_generation()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_generation()
+
+
+@receiver((post_save, post_delete), sender=FavoriteRecipe)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def user_recipes_changed(sender, instance, **kwargs):
+    bump_generation(instance.user_id)
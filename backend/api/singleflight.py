@@ -0,0 +1,169 @@
+"""
+Single-flight cache fills.
+
+When a cached value is missing, one caller computes it and concurrent
+callers of the same key wait for that result instead of computing it
+again: callers in this process wait on a Future, other processes see a
+short-lived lock key in the cache and poll it for the value. Entries
+keep the time their computation took, and are refreshed before expiry
+with a probability that grows as expiry nears (XFetch), so a popular
+key is usually recomputed by a single request before it expires.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+
+LOCK_PREFIX = "single-flight-lock:"
+MISSING = object()
+
+
+class SingleFlight:
+    POLL_INTERVAL = 0.02
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def get(self, cache, key, compute, timeout=None):
+        """cached value of key, computed with compute() when missing."""
+        return self.get_many(
+            cache, [key], lambda keys: {key: compute()}, timeout
+        )[key]
+
+    def get_many(self, cache, keys, compute, timeout=None):
+        """
+        {key: value} of keys, missing ones filled by compute(keys).
+
+        compute returns a dict; keys it leaves out (a deleted row) are
+        left out of the result and are not cached. timeout defaults to
+        the cache's own.
+        """
+        if timeout is None:
+            timeout = cache.default_timeout
+        now = time.time()
+        values, early = {}, []
+        for key, (value, delta, expires_at) in cache.get_many(keys).items():
+            values[key] = value
+            if self._refresh_early(now, delta, expires_at):
+                early.append(key)
+        missing = [key for key in keys if key not in values]
+        if missing or early:
+            values.update(
+                self._fill(cache, missing, early, compute, timeout)
+            )
+        return values
+
+    def _refresh_early(self, now, delta, expires_at):
+        beta = settings.SINGLE_FLIGHT_EARLY_REFRESH_BETA
+        # log of (0, 1] is <= 0, so the left side grows past now.
+        return now - delta * beta * math.log(1 - random.random()) >= (
+            expires_at
+        )
+
+    def _fill(self, cache, missing, early, compute, timeout):
+        owned, waiting = [], {}
+        with self._lock:
+            for key in missing + early:
+                if key in self._calls:
+                    # an early refresh in progress is not waited for.
+                    if key not in early:
+                        waiting[key] = self._calls[key]
+                else:
+                    self._calls[key] = Future()
+                    owned.append(key)
+
+        values = {}
+        try:
+            values.update(
+                self._compute(cache, owned, set(early), compute, timeout)
+            )
+        except BaseException as error:
+            self._release(owned, {}, error)
+            raise
+        self._release(owned, values)
+
+        pending = []
+        for key, future in waiting.items():
+            try:
+                value = future.result(
+                    timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+                )
+            except TimeoutError:
+                pending.append(key)
+                continue
+            if value is not MISSING:
+                values[key] = value
+        if pending:
+            values.update(self._store(cache, pending, compute, timeout))
+        return values
+
+    def _release(self, owned, values, error=None):
+        with self._lock:
+            for key in owned:
+                future = self._calls.pop(key)
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(values.get(key, MISSING))
+
+    def _compute(self, cache, keys, early, compute, timeout):
+        """compute keys this process owns, unless another process does."""
+        if not keys:
+            return {}
+        token = uuid.uuid4().hex
+        locked, remote = [], []
+        for key in keys:
+            if cache.add(
+                LOCK_PREFIX + key, token, settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+            ):
+                locked.append(key)
+            elif key not in early:
+                remote.append(key)
+        values = {}
+        if locked:
+            try:
+                values.update(self._store(cache, locked, compute, timeout))
+            finally:
+                cache.delete_many([LOCK_PREFIX + key for key in locked])
+        if remote:
+            values.update(self._wait(cache, remote, compute, timeout))
+        return values
+
+    def _store(self, cache, keys, compute, timeout):
+        started = time.monotonic()
+        values = compute(keys)
+        delta = time.monotonic() - started
+        expires_at = math.inf if timeout is None else time.time() + timeout
+        cache.set_many(
+            {
+                key: (value, delta, expires_at)
+                for key, value in values.items()
+            },
+            timeout,
+        )
+        return values
+
+    def _wait(self, cache, keys, compute, timeout):
+        """poll for keys another process computes; compute if it gives up."""
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+        values = {}
+        while keys and time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            found = cache.get_many(keys + [LOCK_PREFIX + key for key in keys])
+            values.update(
+                {key: found[key][0] for key in keys if key in found}
+            )
+            keys = [key for key in keys if key not in found]
+            if any(LOCK_PREFIX + key not in found for key in keys):
+                break  # the lock holder failed or its lock expired.
+        if keys:
+            values.update(self._store(cache, keys, compute, timeout))
+        return values
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,169 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LocalStore:
+    """
+    in-process store of throttle state, for a single worker process.
+
+    every process counts on its own, so N workers allow N times the
+    configured rate; gunicorn.conf.py refuses it with more than one.
+
+    keys whose state has expired are dropped every PRUNE_EVERY updates,
+    so memory follows the number of recently active clients.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._updates = 0
+
+    def update(self, key, func):
+        """
+        replace the value under key with func(value) atomically.
+
+        func returns (new_value, expires_at, result); result is returned.
+        """
+        now = time.time()
+        with self._lock:
+            value, expires_at = self._data.get(key, (None, 0))
+            if expires_at <= now:
+                value = None
+            value, expires_at, result = func(value)
+            self._data[key] = (value, expires_at)
+            self._updates += 1
+            if self._updates % self.PRUNE_EVERY == 0:
+                self._data = {
+                    key: item
+                    for key, item in self._data.items()
+                    if item[1] > now
+                }
+        return result
+
+
+class RedisStore:
+    """
+    throttle state in the Redis of THROTTLE_CACHE, shared by all workers
+    and nodes.
+
+    an update is a WATCH / MULTI transaction, retried when another
+    request changed the key meanwhile, so concurrent requests of one
+    client never overwrite each other's state.
+    """
+
+    PREFIX = "throttle:"
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection(settings.THROTTLE_CACHE)
+
+    def update(self, key, func):
+        key = self.PREFIX + key
+
+        def transaction(pipe):
+            value = pipe.get(key)
+            value, expires_at, result = func(
+                None if value is None else float(value)
+            )
+            pipe.multi()
+            pipe.set(
+                key,
+                repr(value),
+                px=max(int((expires_at - time.time()) * 1000), 1),
+            )
+            return result
+
+        return self.client.transaction(
+            transaction, key, value_from_callable=True
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.THROTTLE_STORE)()
+    return _store
+
+
+class GCRAThrottle(SimpleRateThrottle):
+    """
+    generic cell rate algorithm throttle.
+
+    per client only the theoretical arrival time (TAT) of the next request
+    is stored. "N/period" allows a burst of N requests, after which one
+    request is let through every period / N seconds.
+    """
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.now = self.timer()
+        return get_store().update(key, self._check)
+
+    def _check(self, tat):
+        interval = self.duration / self.num_requests
+        tat = max(tat or self.now, self.now)
+        allowed_at = tat + interval - self.duration
+        if self.now < allowed_at:
+            self.retry_after = allowed_at - self.now
+            return tat, tat, False
+        return tat + interval, tat + interval, True
+
+    def wait(self):
+        return self.retry_after
+
+
+class AutocompleteThrottle(GCRAThrottle):
+    scope = "autocomplete"
+
+
+class WriteThrottle(GCRAThrottle):
+    """limits unsafe methods only."""
+
+    scope = "writes"
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
+
+
+class DownloadThrottle(GCRAThrottle):
+    scope = "downloads"
+
+
+class LoginThrottle(GCRAThrottle):
+    """keyed by client address: there is no user before login."""
+
+    scope = "login"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
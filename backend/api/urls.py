@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomAuthToken, IngredientViewSet, LogoutView,
-                    RecipeViewSet, TagViewSet, UserViewSet)
+from .views import (AdmissionStatsView, CustomAuthToken,
+                    DatabasePoolStatsView, IngredientViewSet, LogoutView,
+                    RecipeViewSet, SyncView, TagViewSet, UserViewSet)
 
 router_v1 = DefaultRouter()
 
@@ -24,5 +25,10 @@ url_auth = [
 
 urlpatterns = [
     path("auth/", include(url_auth)),
+    path("health/db-pool/", DatabasePoolStatsView.as_view(), name="db_pool"),
+    path(
+        "health/admission/", AdmissionStatsView.as_view(), name="admission"
+    ),
+    path("sync/", SyncView.as_view(), name="sync"),
     path("", include(router_v1.urls)),
 ]
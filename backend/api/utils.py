@@ -1,6 +1,8 @@
 import csv
 from collections import defaultdict
 
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
 from django.http import HttpResponse
 
 
@@ -28,3 +30,88 @@ def write_shopping_cart_file(user):
         for (ingredient_name, measurement_unit), amount in ingredients.items():
             writer.writerow([ingredient_name, measurement_unit, amount])
         return response
+
+
+def _column_params(model, values):
+    """convert field name/value pairs to quoted columns and db params."""
+    columns, params = [], []
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        columns.append(connection.ops.quote_name(field.column))
+        params.append(
+            field.get_db_prep_save(getattr(value, "pk", value), connection)
+        )
+    return columns, params
+
+
+def insert_or_skip(model, **values):
+    """
+    Insert a row in one statement unless it violates a unique constraint.
+
+    INSERT ... ON CONFLICT DO NOTHING RETURNING; return the saved instance
+    or None if the row already exists. post_save is sent as for save().
+    """
+    instance = model(**values)
+    meta = model._meta
+    fields = [
+        field for field in meta.local_concrete_fields if not field.primary_key
+    ]
+    columns, params = _column_params(
+        model,
+        {field.name: field.pre_save(instance, True) for field in fields},
+    )
+    sql = "INSERT INTO %s (%s) VALUES (%s) ON CONFLICT DO NOTHING " % (
+        connection.ops.quote_name(meta.db_table),
+        ", ".join(columns),
+        ", ".join(["%s"] * len(params)),
+    ) + "RETURNING %s" % connection.ops.quote_name(meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    instance.pk = row[0]
+    instance._state.adding = False
+    instance._state.db = connection.alias
+    post_save.send(
+        sender=model,
+        instance=instance,
+        created=True,
+        update_fields=None,
+        raw=False,
+        using=connection.alias,
+    )
+    return instance
+
+
+def delete_returning(model, **filters):
+    """
+    Delete matching rows in one statement.
+
+    DELETE ... RETURNING; return deleted instances and send post_delete
+    for each of them.
+    """
+    meta = model._meta
+    fields = meta.concrete_fields
+    columns, params = _column_params(model, filters)
+    sql = "DELETE FROM %s WHERE %s RETURNING %s" % (
+        connection.ops.quote_name(meta.db_table),
+        " AND ".join(f"{column} = %s" for column in columns),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    instances = [
+        model.from_db(
+            connection.alias, [field.attname for field in fields], row
+        )
+        for row in rows
+    ]
+    for instance in instances:
+        post_delete.send(
+            sender=model, instance=instance, using=connection.alias
+        )
+    return instances
@@ -1,30 +1,53 @@
+from itertools import chain
+
 import short_url
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                            Subscription, Tag)
+from django_filters.utils import translate_validation
+from foodgram.admission import admission_stats
+from foodgram.db.pool import pool_stats
+from recipes import changelog
+from recipes.feeds import feed_queryset
+from recipes.ingredient_index import ingredient_index
+from recipes.similarity import similarity_index
+from recipes.models import (Change, FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Subscription, Tag)
 from rest_framework import permissions, status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.generics import get_object_or_404 as get_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .filters import IngredientFilter, RecipeFilter
-from .mixins import DefaultIngredientTagMixin
-from .pagination import (PageLimitPagination, PageNumberPaginationDataOnly,
+from .filters import IngredientFilter, RecipeFilter, in_given_order
+from .mixins import DefaultIngredientTagMixin, SparseFieldsetMixin
+from .pagination import (FeedPagination, PageLimitPagination,
+                         PageNumberPaginationDataOnly,
                          UserSubscriptionPagination)
+from . import sql_json
+from .facets import bump_generation as bump_facets_generation
+from .facets import tag_facets
+from .fragments import fragment_rows, recipes_json
+from .readers import recipe_values, recipes_data, users_with_recipes_data
 from .serializers import (AvatarSerializer, CustomAuthTokenSerializer,
                           IngredientSerializer, RecipeCreateUpdateSerializer,
-                          RecipeMiniSerializer, RecipeSerializer,
+                          RecipeIdsSerializer, RecipeMiniSerializer,
+                          RecipeSerializer, SyncParamsSerializer,
                           TagSerializer, UserSerializer,
                           UserWithRecipesSerializer,
-                          UserWithSubscriptionsSerializer)
-from .utils import write_shopping_cart_file
+                          UserWithSubscriptionsSerializer,
+                          WhatCanICookSerializer)
+from .throttling import (AutocompleteThrottle, DownloadThrottle,
+                         LoginThrottle, WriteThrottle)
+from .utils import delete_returning, insert_or_skip, write_shopping_cart_file
 
 User = get_user_model()
 
@@ -37,6 +60,24 @@ class LogoutView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class DatabasePoolStatsView(APIView):
+    """connection pool metrics of the worker that served the request."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(pool_stats())
+
+
+class AdmissionStatsView(APIView):
+    """load shedding decisions of the worker that served the request."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(admission_stats())
+
+
 class TagViewSet(DefaultIngredientTagMixin):
     """Tag view set."""
 
@@ -52,10 +93,12 @@ class IngredientViewSet(DefaultIngredientTagMixin):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = PageNumberPaginationDataOnly
+    throttle_classes = (AutocompleteThrottle,)
 
 
 class CustomAuthToken(ObtainAuthToken):
     serializer_class = CustomAuthTokenSerializer
+    throttle_classes = (LoginThrottle,)
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(
@@ -67,7 +110,7 @@ class CustomAuthToken(ObtainAuthToken):
         return Response({"auth_token": token.key})
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     user/ view set.
 
@@ -82,6 +125,18 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
     pagination_class = UserSubscriptionPagination
+    throttle_classes = (WriteThrottle,)
+    sparse_actions = ("list", "retrieve", "me")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is not None:
+            columns = {field.attname for field in User._meta.concrete_fields}
+            queryset = queryset.only(
+                "id", *(field for field in fields if field in columns)
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ("list", "retrieve", "me"):
@@ -111,7 +166,9 @@ class UserViewSet(viewsets.ModelViewSet):
 
             if "avatar" in request.data:
                 if serializer.is_valid():
-                    serializer.save()
+                    with transaction.atomic():
+                        serializer.save()
+                        self.record_recipes_changed(user)
                     return Response(
                         {"avatar": user.avatar.url}, status=status.HTTP_200_OK
                     )
@@ -124,8 +181,10 @@ class UserViewSet(viewsets.ModelViewSet):
             )
 
         if user.avatar:
-            user.avatar.delete()
-            user.save()
+            with transaction.atomic():
+                user.avatar.delete()
+                user.save()
+                self.record_recipes_changed(user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -175,6 +234,13 @@ class UserViewSet(viewsets.ModelViewSet):
     def subscriptions(self, request):
         """Action get subscibions list."""
         subscriptions = Subscription.objects.filter(user=request.user)
+        if settings.FAST_READ_PATH:
+            author_ids = self.paginate_queryset(
+                list(subscriptions.values_list("following", flat=True))
+            )
+            return self.get_paginated_response(
+                users_with_recipes_data(author_ids, request)
+            )
         users = [sub.following for sub in subscriptions]
 
         paginated_users = self.paginate_queryset(users)
@@ -194,41 +260,46 @@ class UserViewSet(viewsets.ModelViewSet):
         user_to_action = get_object_or_404(User, pk=pk)
 
         if request.method == "POST":
-            user_to_action = get_object_or_404(User, pk=pk)
-
-            if Subscription.objects.filter(
-                user=request.user, following=user_to_action
-            ).exists():
-                return Response(
-                    {"detail": "Вы уже подписаны на этого пользователя."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
             if request.user == user_to_action:
                 return Response(
                     {"detail": "Нельзя подписаться на себя."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            Subscription.objects.create(
-                user=request.user, following=user_to_action
-            )
-            serializer = UserWithRecipesSerializer(
-                user_to_action, context={"request": request}
-            )
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        subscription = Subscription.objects.filter(
-            user=request.user, following=user_to_action
-        )
+            with transaction.atomic():
+                if not insert_or_skip(
+                    Subscription, user=request.user, following=user_to_action
+                ):
+                    return Response(
+                        {"detail": "Вы уже подписаны на этого пользователя."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                changelog.record(
+                    Change.SUBSCRIPTION, [user_to_action.pk], request.user
+                )
 
-        if not subscription.exists():
-            return Response(
-                {"detail": "Вы не подписаны на этого пользователя."},
-                status=status.HTTP_400_BAD_REQUEST,
+            if settings.FAST_READ_PATH:
+                data = users_with_recipes_data([user_to_action.pk], request)[0]
+            else:
+                data = UserWithRecipesSerializer(
+                    user_to_action, context={"request": request}
+                ).data
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        with transaction.atomic():
+            if not delete_returning(
+                Subscription, user=request.user, following=user_to_action
+            ):
+                return Response(
+                    {"detail": "Вы не подписаны на этого пользователя."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            changelog.record(
+                Change.SUBSCRIPTION,
+                [user_to_action.pk],
+                request.user,
+                deleted=True,
             )
-
-        subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def create(self, request, *args, **kwargs):
@@ -237,8 +308,18 @@ class UserViewSet(viewsets.ModelViewSet):
         self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self.record_recipes_changed(serializer.save())
+
+    def record_recipes_changed(self, user):
+        """recipes show their author, so they change with the profile."""
+        changelog.record(
+            Change.RECIPE, user.recipe_set.values_list("pk", flat=True)
+        )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """all recipes actions view set."""
 
     queryset = Recipe.objects.all()
@@ -246,19 +327,280 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_class = (permissions.IsAuthenticatedOrReadOnly,)
+    throttle_classes = (WriteThrottle,)
+    sparse_actions = (
+        "list",
+        "retrieve",
+        "feed",
+        "what_can_i_cook",
+        "similar",
+        "batch_retrieve",
+    )
+    field_presets = {
+        "card": (
+            "id",
+            "author",
+            "name",
+            "image",
+            "tags",
+            "cooking_time",
+            "is_favorited",
+            "is_in_shopping_cart",
+        ),
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in self.sparse_actions:
+            return queryset
+
+        if self.wants_field("author"):
+            queryset = queryset.select_related("author")
+        if self.wants_field("tags"):
+            queryset = queryset.prefetch_related("tags")
+        if self.wants_field("ingredients"):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "recipeingredient_set",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient"
+                    ),
+                )
+            )
+        if not self.wants_field("text"):
+            queryset = queryset.defer("text")
+
+        user = self.request.user
+        if user.is_authenticated:
+            if self.wants_field("is_favorited"):
+                queryset = queryset.annotate(
+                    _is_favorited=Exists(
+                        FavoriteRecipe.objects.filter(
+                            user=user, recipe=OuterRef("pk")
+                        )
+                    )
+                )
+            if self.wants_field("is_in_shopping_cart"):
+                queryset = queryset.annotate(
+                    _is_in_shopping_cart=Exists(
+                        ShoppingCart.objects.filter(
+                            user=user, recipe=OuterRef("pk")
+                        )
+                    )
+                )
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ("create", "update", "partial_update"):
             return RecipeCreateUpdateSerializer
         return RecipeSerializer
 
+    def uses_fragments(self):
+        return (
+            settings.RECIPE_FRAGMENTS
+            and self.get_requested_fields() is None
+            and self.request.accepted_renderer.format == "json"
+        )
+
+    def list(self, request, *args, **kwargs):
+        if (
+            settings.RECIPE_LIST_DB_JSON
+            and sql_json.is_supported()
+            and not request.user.is_authenticated
+            and request.accepted_renderer.format == "json"
+        ):
+            return self.list_db_json(request)
+        if self.uses_fragments():
+            return self.list_fragments(request)
+        if not settings.FAST_READ_PATH:
+            return super().list(request, *args, **kwargs)
+        fields = self.get_requested_fields()
+        queryset = recipe_values(
+            self.filter_queryset(self.get_queryset()), fields
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                recipes_data(page, request.user, fields)
+            )
+        return Response(recipes_data(list(queryset), request.user, fields))
+
+    def get_page_envelope(self):
+        """rendered paginated response up to the results array value."""
+        envelope = self.request.accepted_renderer.render(
+            {
+                "count": self.paginator.page.paginator.count,
+                "next": self.paginator.get_next_link(),
+                "previous": self.paginator.get_previous_link(),
+            }
+        )
+        return envelope[:-1] + b',"results":'
+
+    def list_db_json(self, request):
+        """anonymous list page with recipe objects built by PostgreSQL."""
+        recipe_ids = (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .values_list("pk", flat=True)
+        )
+        page = self.paginate_queryset(recipe_ids)
+        results = sql_json.recipe_list_json(
+            recipe_ids if page is None else page, self.get_requested_fields()
+        )
+        if page is None:
+            return StreamingHttpResponse(
+                results, content_type="application/json"
+            )
+        return StreamingHttpResponse(
+            chain((self.get_page_envelope(),), results, (b"}",)),
+            content_type="application/json",
+            headers=self.paginator.get_count_headers(),
+        )
+
+    def list_fragments(self, request):
+        """list page stitched from cached recipe JSON fragments."""
+        rows = fragment_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        results = recipes_json(
+            list(rows) if page is None else page,
+            request.user,
+            request.accepted_renderer,
+        )
+        if page is None:
+            return HttpResponse(results, content_type="application/json")
+        return HttpResponse(
+            self.get_page_envelope() + results + b"}",
+            content_type="application/json",
+            headers=self.paginator.get_count_headers(),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # no object permissions to check: the viewset has none.
+        if self.uses_fragments():
+            row = get_or_404(fragment_rows(queryset), pk=kwargs["pk"])
+            results = recipes_json(
+                [row], request.user, request.accepted_renderer
+            )
+            return HttpResponse(results[1:-1], content_type="application/json")
+        if not settings.FAST_READ_PATH:
+            return super().retrieve(request, *args, **kwargs)
+        fields = self.get_requested_fields()
+        row = get_or_404(recipe_values(queryset, fields), pk=kwargs["pk"])
+        return Response(recipes_data([row], request.user, fields)[0])
+
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            recipe = serializer.save(author=self.request.user)
+            changelog.record(Change.RECIPE, [recipe.pk])
 
     def perform_update(self, serializer):
         if serializer.instance.author != self.request.user:
             raise PermissionDenied("Вы не можете редактировать чужой рецепт.")
-        serializer.save()
+        with transaction.atomic():
+            recipe = serializer.save()
+            changelog.record(Change.RECIPE, [recipe.pk])
+
+    def perform_destroy(self, instance):
+        recipe_id = instance.pk
+        with transaction.atomic():
+            instance.delete()
+            changelog.record(Change.RECIPE, [recipe_id], deleted=True)
+
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """Recipes of followed authors, newest first."""
+        queryset = self.filter_queryset(
+            feed_queryset(request.user, self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(permissions.AllowAny,),
+    )
+    def facets(self, request):
+        """Recipe counts per tag for the list filters, except tags."""
+        params = request.query_params.copy()
+        params.pop("tags", None)
+        filterset = self.filterset_class(
+            params, queryset=self.get_queryset(), request=request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return Response({"tags": tag_facets(filterset.qs, request)})
+
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(permissions.AllowAny,),
+    )
+    def what_can_i_cook(self, request):
+        """Recipes ranked by coverage of the given ingredients."""
+        params = WhatCanICookSerializer(
+            data={
+                **request.query_params.dict(),
+                "ingredients": [
+                    value
+                    for param in request.query_params.getlist("ingredients")
+                    for value in param.split(",")
+                    if value
+                ],
+            }
+        )
+        params.is_valid(raise_exception=True)
+
+        ranked = ingredient_index.search(
+            params.validated_data["ingredients"],
+            limit=params.validated_data["limit"],
+            max_missing=params.validated_data.get("max_missing"),
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in ranked]
+        )
+        results = []
+        for recipe_id, matched, missing in ranked:
+            if recipe_id not in recipes:
+                continue
+            data = self.get_serializer(recipes[recipe_id]).data
+            data["matched_ingredients"] = matched
+            data["missing_ingredients"] = missing
+            results.append(data)
+        return Response(results)
+
+    @action(
+        detail=True,
+        methods=("get",),
+        permission_classes=(permissions.AllowAny,),
+    )
+    def similar(self, request, pk=None):
+        """Recipes with similar ingredients and tags."""
+        recipe = get_object_or_404(Recipe, pk=pk)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 6)), 50))
+        except ValueError:
+            raise ValidationError({"limit": "Введите правильное число."})
+
+        ranked = similarity_index.similar(recipe.id, limit)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in ranked]
+        )
+        results = []
+        for recipe_id, score in ranked:
+            if recipe_id not in recipes:
+                continue
+            data = self.get_serializer(recipes[recipe_id]).data
+            data["similarity"] = round(score, 3)
+            results.append(data)
+        return Response(results)
 
     @action(
         detail=True,
@@ -291,25 +633,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         user = request.user
         if request.method == "POST":
+            with transaction.atomic():
+                if not insert_or_skip(
+                    FavoriteRecipe, user=user, recipe=recipe
+                ):
+                    return Response(
+                        {"detail": "Рецепт уже в избранном."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                changelog.record(Change.FAVORITE, [recipe.pk], user)
 
-            if user.favorites.filter(recipe=recipe).exists():
-                return Response(
-                    {"detail": "Рецепт уже в избранном."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            FavoriteRecipe.objects.create(user=user, recipe=recipe)
             serializer = RecipeMiniSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        favorite = user.favorites.filter(recipe=recipe).first()
-        if not favorite:
-            return Response(
-                {"detail": "Рецепт не найден в избранном."},
-                status=status.HTTP_400_BAD_REQUEST,
+        with transaction.atomic():
+            if not delete_returning(FavoriteRecipe, user=user, recipe=recipe):
+                return Response(
+                    {"detail": "Рецепт не найден в избранном."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            changelog.record(
+                Change.FAVORITE, [recipe.pk], user, deleted=True
             )
-
-        favorite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -333,31 +678,122 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
 
         if request.method == "POST":
-            if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
-                return Response(
-                    {"error": "Recipe already in shopping cart"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            ShoppingCart.objects.create(user=user, recipe=recipe)
+            with transaction.atomic():
+                if not insert_or_skip(ShoppingCart, user=user, recipe=recipe):
+                    return Response(
+                        {"error": "Recipe already in shopping cart"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                changelog.record(Change.SHOPPING_CART, [recipe.pk], user)
             serializer = RecipeMiniSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        elif request.method == "DELETE":
-            cart_item = ShoppingCart.objects.filter(user=user, recipe=recipe)
-            if cart_item.exists():
-                cart_item.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            else:
+        with transaction.atomic():
+            if not delete_returning(ShoppingCart, user=user, recipe=recipe):
                 return Response(
                     {"error": "Recipe not found in shopping cart"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            changelog.record(
+                Change.SHOPPING_CART, [recipe.pk], user, deleted=True
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=("post",),
+        url_path="batch",
+        permission_classes=(permissions.AllowAny,),
+    )
+    def batch_retrieve(self, request):
+        """Recipes by a long list of ids, in the given order."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = in_given_order(
+            self.get_queryset(), serializer.validated_data["ids"]
+        )
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        url_path="batch/favorite",
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def batch_favorite(self, request):
+        """Add or remove several recipes to favorites at once."""
+        return self._batch_manage(request, FavoriteRecipe, Change.FAVORITE)
+
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        url_path="batch/shopping_cart",
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def batch_shopping_cart(self, request):
+        """Add or remove several recipes to shopping cart at once."""
+        return self._batch_manage(request, ShoppingCart, Change.SHOPPING_CART)
+
+    def _batch_manage(self, request, model, change_kind):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+        user = request.user
+
+        with transaction.atomic():
+            linked = dict(
+                Recipe.objects.filter(id__in=ids)
+                .annotate(
+                    linked=Exists(
+                        model.objects.filter(user=user, recipe=OuterRef("pk"))
+                    )
+                )
+                .values_list("id", "linked")
+            )
+            adding = request.method == "POST"
+            changed = [
+                recipe_id
+                for recipe_id, is_linked in linked.items()
+                if is_linked != adding
+            ]
+            if adding:
+                model.objects.bulk_create(
+                    [
+                        model(user=user, recipe_id=recipe_id)
+                        for recipe_id in changed
+                    ],
+                    ignore_conflicts=True,
+                )
+                done, skipped = "added", "already_added"
+            else:
+                # one DELETE ... IN, without collecting the rows to send
+                # post_delete for each of them.
+                model.objects.filter(
+                    user=user, recipe__in=changed
+                )._raw_delete(model.objects.db)
+                done, skipped = "removed", "not_added"
+            # bulk_create and _raw_delete send no signals for api.signals.
+            bump_facets_generation(user.pk)
+            changelog.record(change_kind, changed, user, deleted=not adding)
+
+        results = []
+        for recipe_id in ids:
+            if recipe_id not in linked:
+                result = "not_found"
+            elif linked[recipe_id] == (request.method == "POST"):
+                result = skipped
+            else:
+                result = done
+            results.append({"id": recipe_id, "status": result})
+        return Response({"results": results}, status=status.HTTP_200_OK)
 
     @action(
         detail=False,
         url_path="download_shopping_cart",
         methods=("get",),
         permission_classes=(permissions.IsAuthenticated,),
+        throttle_classes=(DownloadThrottle,),
     )
     def download_shopping_cart_csv(self, request):
         user = request.user
@@ -371,3 +807,101 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
         return super().destroy(request, *args, **kwargs)
+
+
+class SyncView(APIView):
+    """
+    Changes of recipes, favorites, shopping cart and subscriptions.
+
+    ?since=<cursor> returns what changed after the cursor, with the new
+    cursor. Without since, or when since is older than the compacted
+    log or newer than any cursor, the response only has reset=true and
+    a cursor: the client reloads its lists and syncs from that cursor.
+    The log says which objects changed and the tables say how:
+    concurrent transactions may log changes of one object out of
+    commit order.
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+    lists = (
+        (Change.FAVORITE, "favorites"),
+        (Change.SHOPPING_CART, "shopping_cart"),
+        (Change.SUBSCRIPTION, "subscriptions"),
+    )
+
+    def get(self, request):
+        params = SyncParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        since = params.validated_data.get("since")
+        data = {
+            "cursor": since,
+            "has_more": False,
+            "reset": False,
+            "recipes": [],
+            "deleted_recipes": [],
+            **{
+                name: {"added": [], "removed": []}
+                for kind, name in self.lists
+            },
+        }
+        cursor = changelog.current_cursor()
+        if since is None or not changelog.horizon() <= since <= cursor:
+            data.update(cursor=cursor, reset=True)
+            return Response(data)
+
+        latest, data["cursor"], data["has_more"] = changelog.changes_since(
+            request.user, since, params.validated_data["limit"]
+        )
+        for (kind, object_id), deleted in latest.items():
+            if kind == Change.RECIPE:
+                key = "deleted_recipes" if deleted else "recipes"
+                data[key].append(object_id)
+        for kind, name in self.lists:
+            changed = [
+                object_id
+                for change_kind, object_id in latest
+                if change_kind == kind
+            ]
+            current = self.get_current(kind, changed)
+            for object_id in changed:
+                key = "added" if object_id in current else "removed"
+                data[name][key].append(object_id)
+        data["recipes"] = self.get_recipes(data["recipes"])
+        # deleted after their last change was read.
+        found = {recipe["id"] for recipe in data["recipes"]}
+        data["deleted_recipes"] += [
+            recipe_id
+            for (kind, recipe_id), deleted in latest.items()
+            if kind == Change.RECIPE and not deleted and recipe_id not in found
+        ]
+        return Response(data)
+
+    def get_current(self, kind, object_ids):
+        """ids among object_ids that are in the list of kind now."""
+        if not object_ids:
+            return set()
+        user = self.request.user
+        if kind == Change.SUBSCRIPTION:
+            queryset = Subscription.objects.filter(
+                user=user, following__in=object_ids
+            ).values_list("following_id", flat=True)
+        else:
+            model = (
+                FavoriteRecipe if kind == Change.FAVORITE else ShoppingCart
+            )
+            queryset = model.objects.filter(
+                user=user, recipe__in=object_ids
+            ).values_list("recipe_id", flat=True)
+        return set(queryset)
+
+    def get_recipes(self, recipe_ids):
+        user = self.request.user
+        queryset = Recipe.objects.filter(pk__in=recipe_ids).annotate(
+            _is_favorited=Exists(
+                FavoriteRecipe.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            _is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+        return recipes_data(list(recipe_values(queryset)), user)
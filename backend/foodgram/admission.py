@@ -0,0 +1,117 @@
+"""
+Admission control: shed low-priority requests when the worker is behind.
+
+A worker is overloaded when the request waited in the gateway/gunicorn
+queue longer than ADMISSION_MAX_QUEUE_WAIT_MS (from X-Request-Start) or
+ADMISSION_MAX_IN_FLIGHT requests are already running in this process.
+Then anonymous list pages and exports get 503 with Retry-After, while
+logins, writes and authenticated reads are still served.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.http import JsonResponse
+
+SAFE_METHODS = ("GET", "HEAD")
+
+_lock = threading.Lock()
+_in_flight = 0
+_counters = Counter()
+_peaks = {"in_flight": 0, "queue_wait_ms": 0.0}
+
+
+def queue_wait(request, now):
+    """
+    seconds between X-Request-Start and now, None without the header.
+
+    accepts nginx's "t=<seconds.millis>" as well as plain seconds,
+    milliseconds or microseconds since the epoch.
+    """
+    header = request.META.get("HTTP_X_REQUEST_START")
+    if not header:
+        return None
+    try:
+        started = float(header.strip().removeprefix("t="))
+    except ValueError:
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(now - started, 0.0)
+
+
+def admission_stats():
+    with _lock:
+        stats = dict(_counters)
+        stats.update(
+            {
+                "pid": os.getpid(),
+                "in_flight": _in_flight,
+                "peak_in_flight": _peaks["in_flight"],
+                "peak_queue_wait_ms": round(_peaks["queue_wait_ms"], 1),
+            }
+        )
+    return stats
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.list_paths = re.compile(settings.ADMISSION_LIST_PATHS)
+        self.export_paths = re.compile(settings.ADMISSION_EXPORT_PATHS)
+
+    def __call__(self, request):
+        global _in_flight
+        wait = queue_wait(request, time.time())
+        with _lock:
+            reason = None
+            if wait is not None:
+                wait_ms = wait * 1000
+                _peaks["queue_wait_ms"] = max(
+                    _peaks["queue_wait_ms"], wait_ms
+                )
+                if wait_ms > settings.ADMISSION_MAX_QUEUE_WAIT_MS:
+                    reason = "queue_wait"
+            if reason is None and (
+                _in_flight >= settings.ADMISSION_MAX_IN_FLIGHT
+            ):
+                reason = "in_flight"
+            if reason and self.is_low_priority(request):
+                _counters[f"shed_{reason}"] += 1
+                return self.shed()
+            _counters["admitted_overloaded" if reason else "admitted"] += 1
+            _in_flight += 1
+            _peaks["in_flight"] = max(_peaks["in_flight"], _in_flight)
+        try:
+            return self.get_response(request)
+        finally:
+            with _lock:
+                _in_flight -= 1
+
+    def is_low_priority(self, request):
+        if request.method not in SAFE_METHODS:
+            return False
+        if self.export_paths.search(request.path_info):
+            return True
+        # credentials are only looked at, not checked: shedding has to
+        # cost less than authenticating the request would.
+        authenticated = (
+            "HTTP_AUTHORIZATION" in request.META
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+        )
+        return not authenticated and bool(
+            self.list_paths.match(request.path_info)
+        )
+
+    def shed(self):
+        response = JsonResponse(
+            {"detail": "Сервер перегружен, повторите запрос позже."},
+            status=503,
+        )
+        response["Retry-After"] = settings.ADMISSION_RETRY_AFTER
+        return response
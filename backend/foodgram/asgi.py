@@ -4,4 +4,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported once the apps are loaded.
+from foodgram import events  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """events.PATH streamed by events, everything else by Django."""
+    if scope["type"] == "http" and scope["path"] == events.PATH:
+        await events.recipe_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,53 @@
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from .pool import get_pool
+
+POOL_DEFAULTS = {
+    "min_size": 1,
+    "max_size": 10,
+    "timeout": 5.0,
+    "max_lifetime": 3600.0,
+    "check_after": 30.0,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    postgresql backend that borrows connections from a per-process pool.
+
+    closing a connection returns it to the pool, so with CONN_MAX_AGE = 0
+    every request gets a warm connection without a new handshake.
+    """
+
+    def get_pool(self, conn_params=None):
+        if conn_params is None:
+            conn_params = self.get_connection_params()
+        options = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+        return get_pool(
+            self.alias,
+            conn_params,
+            lambda: base.Database.connect(**conn_params),
+            **options,
+        )
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).getconn()
+
+        options = self.settings_dict["OPTIONS"]
+        try:
+            self.isolation_level = options["isolation_level"]
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                return self.get_pool().putconn(self.connection)
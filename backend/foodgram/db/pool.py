@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+import weakref
+from itertools import chain
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """raised when no connection becomes free within checkout timeout."""
+
+
+class _PooledConnection:
+    __slots__ = ("connection", "created_at", "returned_at", "owner")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+        self.owner = None
+
+    def orphaned(self):
+        """borrowed by a thread that ended without putconn()."""
+        owner = self.owner()
+        return owner is None or not owner.is_alive()
+
+
+class ConnectionPool:
+    """
+    per-process pool of psycopg2 connections.
+
+    connections are borrowed with getconn() and given back with putconn().
+    broken, expired and surplus connections are closed instead of reused,
+    and so are connections of threads that ended without giving them back.
+    """
+
+    def __init__(
+        self,
+        factory,
+        min_size=1,
+        max_size=10,
+        timeout=5.0,
+        max_lifetime=3600.0,
+        check_after=30.0,
+    ):
+        self._factory = factory
+        self.conn_params = None
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}
+        self._inherited = []
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "failed_checks": 0,
+            "reclaimed": 0,
+        }
+        self._fill(self.min_size)
+
+    def getconn(self):
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if self._is_usable(pooled):
+                        return self._checkout(pooled, started, waited)
+                    self._discard(pooled)
+                if self._size() >= self.max_size:
+                    self._reclaim()
+                if self._size() < self.max_size:
+                    pooled = self._connect()
+                    return self._checkout(pooled, started, waited)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        "connection pool exhausted: "
+                        f"{self.max_size} connections in use "
+                        f"for {self.timeout}s"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+    def putconn(self, connection):
+        with self._cond:
+            pooled = self._in_use.pop(id(connection), None)
+            if pooled is None:
+                connection.close()
+                return
+            if self._pid != os.getpid() or not self._reset(pooled):
+                self._discard(pooled)
+            elif self._expired(pooled):
+                self._discard(pooled)
+            else:
+                pooled.returned_at = time.monotonic()
+                self._idle.append(pooled)
+            self._cond.notify()
+
+    def closeall(self):
+        """close idle and borrowed connections; putconn() of those closes."""
+        self._check_fork()
+        with self._cond:
+            for pooled in chain(self._idle, self._in_use.values()):
+                self._discard(pooled)
+            self._idle = []
+            self._in_use = {}
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            self._reclaim()
+            stats = dict(self._stats)
+            stats.update(
+                {
+                    "pid": self._pid,
+                    "min_size": self.min_size,
+                    "max_size": self.max_size,
+                    "size": self._size(),
+                    "in_use": len(self._in_use),
+                    "idle": len(self._idle),
+                    "utilization": len(self._in_use) / self.max_size,
+                    "wait_time_avg": (
+                        stats["wait_time_total"] / stats["waits"]
+                        if stats["waits"]
+                        else 0.0
+                    ),
+                }
+            )
+        return stats
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use)
+
+    def _fill(self, count):
+        with self._cond:
+            while self._size() < count:
+                self._idle.append(self._connect())
+
+    def _connect(self):
+        pooled = _PooledConnection(self._factory())
+        self._stats["created"] += 1
+        return pooled
+
+    def _checkout(self, pooled, started, waited):
+        pooled.owner = weakref.ref(threading.current_thread())
+        self._in_use[id(pooled.connection)] = pooled
+        self._stats["checkouts"] += 1
+        if waited:
+            wait_time = time.monotonic() - started
+            self._stats["waits"] += 1
+            self._stats["wait_time_total"] += wait_time
+            self._stats["wait_time_max"] = max(
+                self._stats["wait_time_max"], wait_time
+            )
+        return pooled.connection
+
+    def _reclaim(self):
+        """close connections of threads that ended without putconn()."""
+        for key, pooled in list(self._in_use.items()):
+            if pooled.orphaned():
+                del self._in_use[key]
+                self._stats["reclaimed"] += 1
+                self._discard(pooled)
+
+    def _discard(self, pooled):
+        self._stats["closed"] += 1
+        try:
+            pooled.connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _expired(self, pooled):
+        return (
+            self.max_lifetime is not None
+            and time.monotonic() - pooled.created_at > self.max_lifetime
+        )
+
+    def _is_usable(self, pooled):
+        """health check on borrow."""
+        connection = pooled.connection
+        if connection.closed or self._expired(pooled):
+            return False
+        if time.monotonic() - pooled.returned_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            self._stats["failed_checks"] += 1
+            return False
+        return True
+
+    def _reset(self, pooled):
+        """roll back leftovers so the next borrower gets a clean session."""
+        connection = pooled.connection
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _check_fork(self):
+        """drop connections inherited from the parent process after fork."""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # keep references: closing would terminate the parent's sessions
+            self._inherited.extend(self._idle)
+            self._inherited.extend(self._in_use.values())
+            self._idle = []
+            self._in_use = {}
+            self._pid = os.getpid()
+        self._fill(self.min_size)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, factory, **options):
+    """return the pool for alias, rebuilding it if conn_params changed."""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.conn_params != conn_params:
+            pool.closeall()
+            pool = None
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(factory, **options)
+            pool.conn_params = conn_params
+    return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+def close_pools():
+    """close every connection of every pool, e.g. before forking workers."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.closeall()
@@ -0,0 +1,408 @@
+"""
+Server-sent events of new recipes by followed authors.
+
+Recipe creation and subscription changes NOTIFY a PostgreSQL channel in
+their transaction (publish_* below, called from recipes.signals), so an
+event is sent only once the change is committed. Every ASGI process has
+one Hub with a single LISTEN connection; the hub indexes open streams
+by followed author and fans a notification out to them. A stream holds
+no thread and no database connection while idle: just a coroutine
+waiting on a future, woken for events and for a heartbeat
+comment every SSE_HEARTBEAT_SECONDS.
+
+Events are
+    id: <recipe id>
+    event: recipe
+    data: {"id": ..., "author": ..., "name": ...}
+and a reconnecting client's Last-Event-ID replays newer recipes of the
+authors it follows, up to SSE_REPLAY_LIMIT.
+
+A stream is added to the hub before its subscriptions and replay are
+read, so nothing committed meanwhile is missed: notifications seen while
+loading are applied once the followed authors are known, subscription
+changes over what was read, and live events of recipes that were also
+replayed are dropped.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from urllib.parse import parse_qs
+
+import psycopg2
+import psycopg2.extensions
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+
+logger = logging.getLogger(__name__)
+
+PATH = "/api/events/recipes/"
+RECIPES_CHANNEL = "foodgram_recipes"
+SUBSCRIPTIONS_CHANNEL = "foodgram_subscriptions"
+HEARTBEAT = b": ping\n\n"
+
+
+def notify(channel, payload):
+    """pg_notify in the current transaction; no-op on other databases."""
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, %s)", [channel, json.dumps(payload)]
+        )
+
+
+def publish_recipe(recipe):
+    notify(
+        RECIPES_CHANNEL,
+        {"id": recipe.pk, "author": recipe.author_id, "name": recipe.name},
+    )
+
+
+def publish_subscription(user_id, author_id, follows):
+    notify(
+        SUBSCRIPTIONS_CHANNEL,
+        {"user": user_id, "author": author_id, "follows": follows},
+    )
+
+
+def recipe_event(recipe):
+    """bytes of one SSE event, built once per recipe for all streams."""
+    data = json.dumps(recipe, ensure_ascii=False)
+    return f"id: {recipe['id']}\nevent: recipe\ndata: {data}\n\n".encode()
+
+
+class Stream:
+    """pending events of one open connection."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.following = set()
+        # until follow(): subscription changes as {author id: follows}
+        # and recipe events as (author id, recipe id, event) seen.
+        self.changes = {}
+        self.early = []
+        self.replayed = set()
+        self.events = deque()
+        self.waiter = None
+        self.closed = False
+
+    def push(self, recipe_id, event):
+        if recipe_id in self.replayed:
+            return
+        if len(self.events) >= settings.SSE_QUEUE_SIZE:
+            # a client this far behind reconnects with Last-Event-ID.
+            self.close()
+            return
+        self.events.append((recipe_id, event))
+        self.wake()
+
+    def replay(self, recipe_ids):
+        """drop queued and later live events of replayed recipes."""
+        self.replayed = set(recipe_ids)
+        self.events = deque(
+            item for item in self.events if item[0] not in self.replayed
+        )
+
+    def close(self):
+        self.closed = True
+        self.wake()
+
+    def wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def wait(self, timeout):
+        """
+        pending events, [] when timeout passed without any.
+
+        a bare future and timer: asyncio.wait_for() would create a task
+        per wait, most of what waking thousands of streams costs.
+        """
+        if not self.events and not self.closed:
+            loop = asyncio.get_running_loop()
+            self.waiter = loop.create_future()
+            timer = loop.call_later(timeout, self.wake)
+            try:
+                await self.waiter
+            finally:
+                timer.cancel()
+                self.waiter = None
+        events = [event for _, event in self.events]
+        self.events.clear()
+        return events
+
+
+class Hub:
+    """per-process fan-out of notifications to open streams."""
+
+    RECONNECT_DELAY = 1
+
+    def __init__(self):
+        self.by_author = defaultdict(set)
+        self.by_user = defaultdict(set)
+        self.loading = set()
+        self.listener = None
+        self.listening = None
+
+    async def start(self):
+        """start listening unless already, return once LISTEN is on."""
+        if self.listener is None or self.listener.done():
+            # created in the running loop, python < 3.10 binds it on init.
+            self.listening = asyncio.Event()
+            self.listener = asyncio.ensure_future(self.listen())
+        await self.listening.wait()
+
+    def add(self, stream):
+        """collect notifications for stream until follow()."""
+        self.by_user[stream.user_id].add(stream)
+        self.loading.add(stream)
+
+    def follow(self, stream, following):
+        """
+        deliver recipes of the loaded followed authors to stream.
+
+        a subscription change seen since add() was committed after the
+        read or agrees with it, so it wins over the read.
+        """
+        self.loading.discard(stream)
+        changes, stream.changes = stream.changes, None
+        early, stream.early = stream.early, []
+        for author_id in following:
+            self._follow(stream, author_id, True)
+        for author_id, follows in changes.items():
+            self._follow(stream, author_id, follows)
+        for author_id, recipe_id, event in early:
+            if author_id in stream.following:
+                stream.push(recipe_id, event)
+
+    def _follow(self, stream, author_id, follows):
+        if follows:
+            stream.following.add(author_id)
+            self.by_author[author_id].add(stream)
+        else:
+            stream.following.discard(author_id)
+            self._discard(self.by_author, author_id, stream)
+
+    def remove(self, stream):
+        self.loading.discard(stream)
+        self._discard(self.by_user, stream.user_id, stream)
+        for author_id in stream.following:
+            self._discard(self.by_author, author_id, stream)
+
+    def _discard(self, index, key, stream):
+        streams = index.get(key)
+        if streams is not None:
+            streams.discard(stream)
+            if not streams:
+                del index[key]
+
+    def dispatch(self, channel, payload):
+        data = json.loads(payload)
+        if channel == RECIPES_CHANNEL:
+            event = recipe_event(data)
+            for stream in list(self.by_author.get(data["author"], ())):
+                stream.push(data["id"], event)
+            for stream in self.loading:
+                stream.early.append((data["author"], data["id"], event))
+        elif channel == SUBSCRIPTIONS_CHANNEL:
+            for stream in list(self.by_user.get(data["user"], ())):
+                if stream.changes is not None:
+                    stream.changes[data["author"]] = data["follows"]
+                else:
+                    self._follow(stream, data["author"], data["follows"])
+
+    async def listen(self):
+        """LISTEN forever, reconnecting after database errors."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                listener = await loop.run_in_executor(None, self.connect)
+            except psycopg2.Error as error:
+                logger.warning("events: LISTEN failed: %s", error)
+                await asyncio.sleep(self.RECONNECT_DELAY)
+                continue
+            fileno = listener.fileno()
+            readable = asyncio.Event()
+            loop.add_reader(fileno, readable.set)
+            self.listening.set()
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    listener.poll()
+                    while listener.notifies:
+                        notification = listener.notifies.pop(0)
+                        self.dispatch(
+                            notification.channel, notification.payload
+                        )
+            except psycopg2.Error as error:
+                # notifications sent meanwhile are lost; clients that
+                # reconnect get them from Last-Event-ID.
+                logger.warning("events: LISTEN connection lost: %s", error)
+            finally:
+                self.listening.clear()
+                loop.remove_reader(fileno)
+                listener.close()
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    def connect(self):
+        listener = psycopg2.connect(
+            **connections["default"].get_connection_params()
+        )
+        listener.set_isolation_level(
+            psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT
+        )
+        with listener.cursor() as cursor:
+            cursor.execute(f"LISTEN {RECIPES_CHANNEL}")
+            cursor.execute(f"LISTEN {SUBSCRIPTIONS_CHANNEL}")
+        return listener
+
+
+hub = Hub()
+
+
+@sync_to_async
+def load_user(key):
+    """id of the active user of a token key, or None."""
+    from rest_framework.authtoken.models import Token
+
+    try:
+        return (
+            Token.objects.filter(key=key, user__is_active=True)
+            .values_list("user_id", flat=True)
+            .first()
+        )
+    finally:
+        connections.close_all()
+
+
+@sync_to_async
+def load_following(user_id):
+    from recipes.models import Subscription
+
+    try:
+        return list(
+            Subscription.objects.filter(user=user_id).values_list(
+                "following", flat=True
+            )
+        )
+    finally:
+        connections.close_all()
+
+
+@sync_to_async
+def load_replay(following, last_event_id):
+    """[(recipe id, event)] of newer recipes of followed authors."""
+    from recipes.models import Recipe
+
+    try:
+        return [
+            (pk, recipe_event({"id": pk, "author": author_id, "name": name}))
+            for pk, author_id, name in Recipe.objects.filter(
+                pk__gt=last_event_id, author__in=following
+            )
+            .order_by("pk")
+            .values_list("pk", "author_id", "name")[
+                : settings.SSE_REPLAY_LIMIT
+            ]
+        ]
+    finally:
+        connections.close_all()
+
+
+def credentials(scope):
+    """token key and Last-Event-ID of the request."""
+    headers = dict(scope["headers"])
+    key = None
+    authorization = headers.get(b"authorization", b"").decode()
+    if authorization.startswith("Token "):
+        key = authorization[len("Token "):].strip()
+    else:
+        # EventSource can not send headers.
+        key = parse_qs(scope["query_string"].decode()).get("token", [None])[0]
+    last_event_id = headers.get(b"last-event-id", b"").decode()
+    return key, int(last_event_id) if last_event_id.isdigit() else None
+
+
+async def send_json(send, status, data):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send(
+        {
+            "type": "http.response.body",
+            "body": json.dumps(data, ensure_ascii=False).encode(),
+        }
+    )
+
+
+async def recipe_events(scope, receive, send):
+    """ASGI app of PATH."""
+    if scope["method"] != "GET":
+        await send_json(send, 405, {"detail": "Метод не разрешён."})
+        return
+    key, last_event_id = credentials(scope)
+    user_id = await load_user(key) if key else None
+    if user_id is None:
+        await send_json(
+            send, 401, {"detail": "Учетные данные не были предоставлены."}
+        )
+        return
+
+    # registered before anything is read and LISTEN is on, so recipes
+    # and subscriptions committed while loading still reach the stream.
+    await hub.start()
+    stream = Stream(user_id)
+    hub.add(stream)
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        stream.close()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        hub.follow(stream, await load_following(user_id))
+        replay = []
+        if last_event_id is not None:
+            replay = await load_replay(set(stream.following), last_event_id)
+            stream.replay(pk for pk, _ in replay)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"retry: 5000\n\n"
+                + b"".join(event for _, event in replay),
+                "more_body": True,
+            }
+        )
+        while not stream.closed:
+            events = await stream.wait(settings.SSE_HEARTBEAT_SECONDS)
+            if stream.closed:
+                break
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": b"".join(events) or HEARTBEAT,
+                    "more_body": True,
+                }
+            )
+    finally:
+        hub.remove(stream)
+        watcher.cancel()
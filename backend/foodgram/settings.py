@@ -25,15 +25,15 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "rest_framework_simplejwt",
     "rest_framework.authtoken",
     "api",
-    "djoser",
     "recipes",
     "redirect",
+    "mediafiles",
 ]
 
 MIDDLEWARE = [
+    "foodgram.admission.AdmissionControlMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -47,14 +47,46 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend"
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.CachedCountPagination",
     "PAGE_SIZE": 6,
     "PAGINATE_BY_PARAM": "limit",
+    "DEFAULT_THROTTLE_RATES": {
+        "autocomplete": os.getenv("THROTTLE_AUTOCOMPLETE", "10/second"),
+        "writes": os.getenv("THROTTLE_WRITES", "60/minute"),
+        "downloads": os.getenv("THROTTLE_DOWNLOADS", "10/hour"),
+        "login": os.getenv("THROTTLE_LOGIN", "10/minute"),
+    },
 }
 
+# state every worker must see (throttle limits, facet generations) is kept
+# in Redis at SHARED_CACHE_LOCATION, e.g. redis://redis:6379/0. unset, it
+# stays in each process, which is only right for a single worker:
+# gunicorn.conf.py refuses more.
+SHARED_CACHE_LOCATION = os.getenv("SHARED_CACHE_LOCATION")
+
+# api.throttling.RedisStore shares limits through THROTTLE_CACHE,
+# api.throttling.LocalStore keeps them per process.
+THROTTLE_STORE = os.getenv(
+    "THROTTLE_STORE",
+    "api.throttling.RedisStore"
+    if SHARED_CACHE_LOCATION
+    else "api.throttling.LocalStore",
+)
+
+THROTTLE_CACHE = "shared"
+
 
 ROOT_URLCONF = "foodgram.urls"
 
@@ -79,12 +111,19 @@ WSGI_APPLICATION = "foodgram.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "foodgram.db",
         "NAME": os.getenv("POSTGRES_DB", "django"),
         "USER": os.getenv("POSTGRES_USER", "django"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", ""),
         "PORT": os.getenv("DB_PORT", 5432),
+        "CONN_MAX_AGE": 0,
+        "POOL": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 4)),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 1800)),
+        },
     }
 }
 
@@ -116,11 +155,6 @@ USE_L10N = True
 
 USE_TZ = True
 
-SIMPLE_JWT = {
-    "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
-    "AUTH_HEADER_TYPES": ("Bearer",),
-}
-
 STATIC_URL = "/static/"
 
 STATIC_ROOT = BASE_DIR / "collected_static"
@@ -134,3 +168,127 @@ EMAIL_FILE_PATH = "./email"
 MEDIA_URL = "/media/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+MEDIA_SERVE_DIRS = ("users/avatars/",)
+
+MEDIA_ACCEL_REDIRECT_LOCATION = os.getenv("MEDIA_ACCEL_REDIRECT_LOCATION", "")
+
+RANKING_TRENDING_HALF_LIFE = timedelta(
+    hours=int(os.getenv("RANKING_TRENDING_HALF_LIFE_HOURS", 48))
+)
+
+INGREDIENT_INDEX_SYNC_INTERVAL = 5
+
+INGREDIENT_INDEX_REBUILD_INTERVAL = 3600
+
+SIMILARITY_INDEX_DIR = os.getenv(
+    "SIMILARITY_INDEX_DIR", os.path.join(BASE_DIR, "similarity_index")
+)
+
+SIMILARITY_SYNC_INTERVAL = 5
+
+FEED_MATERIALIZE_MIN_FOLLOWING = int(
+    os.getenv("FEED_MATERIALIZE_MIN_FOLLOWING", 100)
+)
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 16))
+
+ADMISSION_MAX_QUEUE_WAIT_MS = int(
+    os.getenv("ADMISSION_MAX_QUEUE_WAIT_MS", 1000)
+)
+
+ADMISSION_RETRY_AFTER = 5
+
+ADMISSION_LIST_PATHS = (
+    r"^/api/(recipes|recipes/facets|users|tags|ingredients)/$"
+)
+
+ADMISSION_EXPORT_PATHS = r"/download_shopping_cart/$"
+
+# recipe, tag, ingredient and subscription reads built from values()
+# (api/readers.py) instead of ModelSerializer; output is the same.
+FAST_READ_PATH = os.getenv("FAST_READ_PATH", "True") == "True"
+
+# anonymous recipe list pages assembled as JSON by PostgreSQL
+# (api/sql_json.py); ignored on other databases.
+RECIPE_LIST_DB_JSON = os.getenv("RECIPE_LIST_DB_JSON", "False") == "True"
+
+# pre-rendered recipe JSON (api/fragments.py). keys hold Recipe.version,
+# so any cache backend is safe; images are spliced in per request, so an
+# entry is a few KB whatever the image size.
+RECIPE_FRAGMENTS = os.getenv("RECIPE_FRAGMENTS", "True") == "True"
+RECIPE_FRAGMENT_CACHE = "recipe_fragments"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    RECIPE_FRAGMENT_CACHE: {
+        "BACKEND": os.getenv(
+            "RECIPE_FRAGMENT_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv(
+            "RECIPE_FRAGMENT_CACHE_LOCATION", "recipe-fragments"
+        ),
+        "TIMEOUT": int(os.getenv("RECIPE_FRAGMENT_TIMEOUT", 24 * 60 * 60)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("RECIPE_FRAGMENT_MAX_ENTRIES", 2000))
+        },
+    },
+    "shared": (
+        {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": SHARED_CACHE_LOCATION,
+        }
+        if SHARED_CACHE_LOCATION
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "shared",
+            # facet counts would otherwise cull generations past 300.
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    ),
+}
+
+# tag and ingredient list pages (api/mixins.py). a change drops them in
+# the process that made it; per-process caches elsewhere keep old pages
+# up to the timeout.
+REFERENCE_CACHE = "default"
+REFERENCE_CACHE_TIMEOUT = int(os.getenv("REFERENCE_CACHE_TIMEOUT", 300))
+
+# api/singleflight.py: how long one computation holds its lock, and how
+# eagerly entries are refreshed before expiry (0 turns it off).
+SINGLE_FLIGHT_LOCK_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", 10))
+SINGLE_FLIGHT_EARLY_REFRESH_BETA = float(
+    os.getenv("SINGLE_FLIGHT_EARLY_REFRESH_BETA", 1.0)
+)
+
+# api/pagination.py: counts of at least PAGINATION_COUNT_CACHE_MIN rows are
+# cached per filter combination; unfiltered PostgreSQL tables of at least
+# PAGINATION_ESTIMATE_MIN rows are counted from planner statistics, which
+# are cached per table for PAGINATION_COUNT_TIMEOUT seconds too.
+PAGINATION_COUNT_CACHE = "default"
+PAGINATION_COUNT_TIMEOUT = int(os.getenv("PAGINATION_COUNT_TIMEOUT", 30))
+PAGINATION_COUNT_CACHE_MIN = int(
+    os.getenv("PAGINATION_COUNT_CACHE_MIN", 1000)
+)
+PAGINATION_ESTIMATE_MIN = int(os.getenv("PAGINATION_ESTIMATE_MIN", 100000))
+
+# tag facet counts of /api/recipes/facets/ (api/facets.py) and their
+# generations; a change in one worker must drop the counts of all, so
+# they live in the shared Redis.
+FACET_CACHE = "shared"
+FACET_CACHE_TIMEOUT = int(os.getenv("FACET_CACHE_TIMEOUT", 300))
+
+# tombstones of the /api/sync/ change log kept by compact_changes; clients
+# with older cursors reload their lists.
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", 30))
+
+# /api/events/recipes/ streams (foodgram/events.py): a heartbeat comment
+# keeps idle connections open through proxies; a stream more than
+# SSE_QUEUE_SIZE events behind is closed and the client replays at most
+# SSE_REPLAY_LIMIT missed recipes when it reconnects.
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", 100))
+SSE_REPLAY_LIMIT = int(os.getenv("SSE_REPLAY_LIMIT", 50))
@@ -1,5 +1,4 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
@@ -7,9 +6,5 @@ urlpatterns = [
     path("r/", include("redirect.urls")),
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
+    path(settings.MEDIA_URL.lstrip("/"), include("mediafiles.urls")),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
@@ -0,0 +1,41 @@
+"""
+Priming of lazily built state, run once before worker processes fork.
+
+Whatever is loaded here is shared by the workers copy-on-write instead of
+being built again in every worker on its first requests.
+"""
+import inspect
+
+from django.apps import apps
+from django.urls import get_resolver
+from rest_framework import serializers
+from rest_framework.settings import IMPORT_STRINGS, api_settings
+
+
+def prime_code():
+    """import lazily loaded code and fill django / DRF caches."""
+    for model in apps.get_models():
+        model._meta.get_fields()
+    get_resolver().reverse_dict
+    for name in IMPORT_STRINGS:
+        getattr(api_settings, name)
+
+    from api import serializers as api_serializers
+
+    for _, serializer_class in inspect.getmembers(
+        api_serializers, inspect.isclass
+    ):
+        if (
+            issubclass(serializer_class, serializers.Serializer)
+            and serializer_class.__module__ == api_serializers.__name__
+        ):
+            serializer_class(context={}).fields
+
+
+def prime_reference_data():
+    """load the in-memory ingredient and similarity indexes."""
+    from recipes.ingredient_index import ingredient_index
+    from recipes.similarity import similarity_index
+
+    ingredient_index.rebuild()
+    similarity_index.refresh()
@@ -0,0 +1,72 @@
+"""
+gunicorn settings.
+
+GUNICORN_WORKER_CLASS  sync (default) or gthread
+GUNICORN_WORKERS       worker processes, 2 * CPU + 1 by default
+GUNICORN_THREADS       threads per gthread worker; keep it within
+                       DB_POOL_MAX_SIZE so threads don't wait for a connection
+
+More than one worker is refused without SHARED_CACHE_LOCATION or with
+THROTTLE_STORE=api.throttling.LocalStore: every worker would allow the
+full rate on its own and keep its own facet generations.
+
+The application is loaded once in the master (preload_app) and warmed up
+there, then gc.freeze() moves everything loaded so far out of the
+collector's reach: the collector would otherwise touch those objects in
+every worker and un-share their memory pages.
+"""
+import gc
+import multiprocessing
+import os
+import time
+
+# no collections while the app is imported: objects that survive until
+# gc.freeze() stay in shared pages.
+gc.disable()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8090")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+workers = int(
+    os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+)
+# gunicorn silently switches sync workers to gthread when threads > 1
+threads = (
+    int(os.getenv("GUNICORN_THREADS", 4)) if worker_class == "gthread" else 1
+)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+preload_app = True
+
+
+def when_ready(server):
+    from django.conf import settings
+    from django.db import DatabaseError, connections
+
+    per_process = not settings.SHARED_CACHE_LOCATION or (
+        settings.THROTTLE_STORE == "api.throttling.LocalStore"
+    )
+    if server.cfg.workers > 1 and per_process:
+        # gunicorn exits with the message of a RuntimeError.
+        raise RuntimeError(
+            f"{server.cfg.workers} workers keep throttle limits and facet "
+            "generations per process; set SHARED_CACHE_LOCATION to a "
+            "Redis URL or GUNICORN_WORKERS=1"
+        )
+
+    from foodgram.db.pool import close_pools
+    from foodgram.warmup import prime_code, prime_reference_data
+
+    started = time.perf_counter()
+    prime_code()
+    try:
+        prime_reference_data()
+    except DatabaseError as error:
+        server.log.warning("Reference data not preloaded: %s", error)
+    finally:
+        # workers must not share the master's database sockets
+        connections.close_all()
+        close_pools()
+    gc.freeze()
+    gc.enable()
+    server.log.info(
+        "Warmed up in %.0f ms", (time.perf_counter() - started) * 1000
+    )
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import serve_media
+
+urlpatterns = [
+    path("<path:path>", serve_media, name="media"),
+]
@@ -0,0 +1,131 @@
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# uploads are named by content hash (see Base64ImageField), optionally
+# followed by the suffix storage adds when the name is already taken.
+HASHED_NAME = re.compile(r"(?:^|/)[0-9a-f]{16}(?:_\w+)?\.\w+$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+CHUNK_SIZE = 64 * 1024
+
+
+def _byte_range(header, size):
+    """
+    (start, end) of a single "bytes=" range, None to send the whole file.
+
+    multi-range and malformed headers are ignored, as RFC 9110 allows.
+    start == size means the range can't be satisfied.
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if not suffix:
+            return size, size
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    end = min(int(last), size - 1) if last else size - 1
+    return min(start, size), end
+
+
+def _read(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, full_path, size, content_type, etag):
+    header = request.META.get("HTTP_RANGE")
+    if_range = request.META.get("HTTP_IF_RANGE")
+    byte_range = None
+    if header and (not if_range or if_range == etag):
+        byte_range = _byte_range(header, size)
+    if byte_range is None:
+        # FileResponse goes through wsgi.file_wrapper, which gunicorn
+        # serves with sendfile().
+        response = FileResponse(
+            open(full_path, "rb"), content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        if start >= size:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read(full_path, start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = length
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Отдаёт файл из MEDIA_ROOT.
+
+    Django проверяет, что файл лежит в разрешённом каталоге и существует,
+    и отвечает на If-None-Match. Сами байты при заданном
+    MEDIA_ACCEL_REDIRECT_LOCATION отдаёт nginx (X-Accel-Redirect, Range
+    он обрабатывает сам), иначе — FileResponse.
+    """
+    path = posixpath.normpath(path)
+    if not path.startswith(settings.MEDIA_SERVE_DIRS):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+
+    etag = f'"{int(file_stat.st_mtime):x}-{file_stat.st_size:x}"'
+    last_modified = http_date(file_stat.st_mtime)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content_type = (
+            mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        )
+        location = settings.MEDIA_ACCEL_REDIRECT_LOCATION
+        if location:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = location + quote(path)
+        else:
+            response = _file_response(
+                request, full_path, file_stat.st_size, content_type, etag
+            )
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    response["Cache-Control"] = (
+        IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+    )
+    return response
@@ -1,10 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db.models import Count
 from django.forms.models import BaseInlineFormSet
+from django.http import StreamingHttpResponse
 from django.utils.translation import gettext_lazy as _
 
+from .backup import export_lines
 from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredient,
                      ShoppingCart, Subscription, Tag)
 
@@ -23,21 +24,27 @@ class IngredientsInlineFormset(BaseInlineFormSet):
 class IngredientsInline(admin.TabularInline):
     model = RecipeIngredient
     formset = IngredientsInlineFormset
+    autocomplete_fields = ("ingredient",)
     extra = 0
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            "recipe", "ingredient"
+        )
+
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ("name", "measurement_unit")
     search_fields = ("name",)
-    list_filter = ("name",)
+    list_filter = ("measurement_unit",)
     empty_value_display = "-пусто-"
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ("name", "slug")
-    search_fields = ("slug",)
+    search_fields = ("name", "slug")
     list_filter = ("slug",)
     empty_value_display = "-пусто-"
 
@@ -52,49 +59,76 @@ class RecipeAdmin(admin.ModelAdmin):
         "pub_at",
         "favorite_count",
     )
+    list_select_related = ("author", "ranking")
+    search_fields = ("name",)
+    autocomplete_fields = ("author", "tags")
+    show_full_result_count = False
+    actions = ("export_ndjson",)
 
     def favorite_count(self, obj):
-        """Возвращает количество добавлений в избранное для рецепта."""
-        return obj._favorite_count
+        """Возвращает количество добавлений в избранное для рецепта.
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(
-            _favorite_count=Count("favorited_by", distinct=True),
-        )
-        return queryset
+        Значение берётся из денормализованного рейтинга (ranking_update),
+        а не считается по избранному на каждой странице списка.
+        """
+        ranking = getattr(obj, "ranking", None)
+        return ranking.favorites_count if ranking else 0
 
+    favorite_count.admin_order_field = "ranking__favorites_count"
     favorite_count.short_description = "Количество добавлений в избранное"
 
     inlines = (IngredientsInline,)
 
+    @admin.action(description="Экспортировать в NDJSON")
+    def export_ndjson(self, request, queryset):
+        response = StreamingHttpResponse(
+            export_lines(queryset), content_type="application/x-ndjson"
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+        return response
+
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ("recipe", "ingredient")
-    search_fields = ("recipe",)
-    list_filter = ("ingredient",)
+    list_select_related = ("recipe", "ingredient")
+    search_fields = ("recipe__name", "ingredient__name")
+    autocomplete_fields = ("recipe", "ingredient")
+    show_full_result_count = False
     empty_value_display = "-пусто-"
 
 
 @admin.register(FavoriteRecipe)
-class FavoriteRecipe(admin.ModelAdmin):
+class FavoriteRecipeAdmin(admin.ModelAdmin):
     list_display = ("user", "recipe")
-    search_fields = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    search_fields = ("user__username", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
+    show_full_result_count = False
     empty_value_display = "-пусто-"
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ("user", "following")
+    list_select_related = ("user", "following")
+    search_fields = ("user__username", "following__username")
+    autocomplete_fields = ("user", "following")
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    search_fields = ("user__username", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
+    show_full_result_count = False
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ("id", "username", "email")
-    search_fields = ("emai", "username")
+    search_fields = ("email", "username")
@@ -0,0 +1,272 @@
+import json
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .models import Ingredient, Recipe, RecipeIngredient, Tag, User
+
+CHUNK_SIZE = 1000
+# upper bound of PositiveIntegerField on every backend.
+MAX_POSITIVE_INT = 2147483647
+
+RecipeTag = Recipe.tags.through
+REQUIRED_FIELDS = (
+    "author",
+    "name",
+    "text",
+    "image",
+    "cooking_time",
+    "pub_at",
+    "tags",
+    "ingredients",
+)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def export_lines(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    yield recipes as NDJSON lines, one recipe per line.
+
+    recipes are read through a server-side cursor; ingredients and tags
+    are fetched per chunk, so memory does not grow with the table.
+    images are exported as storage paths, not file contents.
+    """
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    rows = (
+        queryset.order_by("id")
+        .values_list(
+            "id",
+            "author__username",
+            "name",
+            "text",
+            "image",
+            "cooking_time",
+            "pub_at",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk in _chunks(rows, chunk_size):
+        recipe_ids = [row[0] for row in chunk]
+        tags = defaultdict(list)
+        for recipe_id, slug in (
+            RecipeTag.objects.filter(recipe__in=recipe_ids)
+            .order_by("id")
+            .values_list("recipe", "tag__slug")
+        ):
+            tags[recipe_id].append(slug)
+        ingredients = defaultdict(list)
+        for recipe_id, name, unit, amount in (
+            RecipeIngredient.objects.filter(recipe__in=recipe_ids)
+            .order_by("id")
+            .values_list(
+                "recipe",
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                "amount",
+            )
+        ):
+            ingredients[recipe_id].append(
+                {"name": name, "measurement_unit": unit, "amount": amount}
+            )
+        for recipe_id, author, name, text, image, time, pub_at in chunk:
+            record = {
+                "author": author,
+                "name": name,
+                "text": text,
+                "image": image,
+                "cooking_time": time,
+                "pub_at": pub_at.isoformat(),
+                "tags": tags[recipe_id],
+                "ingredients": ingredients[recipe_id],
+            }
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _parse(lines):
+    for line_no, line in enumerate(lines, start=1):
+        if line.strip():
+            yield line_no, line
+
+
+def import_lines(lines, batch_size=CHUNK_SIZE, on_skip=None):
+    """
+    create recipes from NDJSON lines made by export_lines.
+
+    authors are matched by username, tags by slug and ingredients by
+    (name, measurement_unit). a line with values the API would reject
+    or that references something missing here is skipped and reported
+    through on_skip(line_no, reason), so one bad line does not abort its
+    batch. repeated tags are dropped and repeated ingredients merged,
+    their amounts added up. every batch is inserted with bulk_create in
+    its own transaction. returns the number of created recipes.
+    """
+    ingredient_ids = {
+        (name, unit): pk
+        for pk, name, unit in Ingredient.objects.values_list(
+            "id", "name", "measurement_unit"
+        )
+    }
+    tag_ids = dict(Tag.objects.values_list("slug", "id"))
+    created = 0
+    for batch in _chunks(_parse(lines), batch_size):
+        records = []
+        for line_no, line in batch:
+            try:
+                records.append((line_no, json.loads(line)))
+            except ValueError as error:
+                if on_skip:
+                    on_skip(line_no, f"invalid JSON: {error}")
+        author_ids = dict(
+            User.objects.filter(
+                username__in=[
+                    record.get("author")
+                    for _, record in records
+                    if isinstance(record, dict)
+                    and isinstance(record.get("author"), str)
+                ]
+            ).values_list("username", "id")
+        )
+        valid = []
+        for line_no, record in records:
+            reason = _invalid_value(record) or _missing_reference(
+                record, author_ids, tag_ids, ingredient_ids
+            )
+            if reason:
+                if on_skip:
+                    on_skip(line_no, reason)
+            else:
+                valid.append(_merge_repeated(record))
+        created += _create_batch(valid, author_ids, tag_ids, ingredient_ids)
+    return created
+
+
+def _positive_int(value):
+    # bool is an int too; floats and strings are rejected like in the API.
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and 1 <= value <= MAX_POSITIVE_INT
+    )
+
+
+def _invalid_value(record):
+    """why the record can not be saved as it is, or None."""
+    if not isinstance(record, dict):
+        return "record is not an object"
+    missing = [field for field in REQUIRED_FIELDS if field not in record]
+    if missing:
+        return f"missing fields: {', '.join(missing)}"
+    for field in ("author", "name", "text", "image", "pub_at"):
+        if not isinstance(record[field], str):
+            return f"{field} is not a string"
+    for field in ("name", "image"):
+        max_length = Recipe._meta.get_field(field).max_length
+        if len(record[field]) > max_length:
+            return f"{field} is longer than {max_length} characters"
+    if not _positive_int(record["cooking_time"]):
+        return f"invalid cooking_time {record['cooking_time']!r}"
+    try:
+        datetime.fromisoformat(record["pub_at"])
+    except ValueError:
+        return f"invalid pub_at {record['pub_at']!r}"
+    if not isinstance(record["tags"], list) or not all(
+        isinstance(slug, str) for slug in record["tags"]
+    ):
+        return "tags is not a list of slugs"
+    if not isinstance(record["ingredients"], list):
+        return "ingredients is not a list"
+    totals = defaultdict(int)
+    for item in record["ingredients"]:
+        if not isinstance(item, dict) or not all(
+            isinstance(item.get(field), str)
+            for field in ("name", "measurement_unit")
+        ):
+            return "ingredient without name and measurement_unit"
+        if not _positive_int(item.get("amount")):
+            return "invalid amount {!r} of {!r}".format(
+                item.get("amount"), item["name"]
+            )
+        totals[(item["name"], item["measurement_unit"])] += item["amount"]
+    if any(total > MAX_POSITIVE_INT for total in totals.values()):
+        return "total amount of a repeated ingredient is too large"
+    return None
+
+
+def _merge_repeated(record):
+    """record with unique tags and ingredients, in first-seen order."""
+    amounts = {}
+    for item in record["ingredients"]:
+        key = (item["name"], item["measurement_unit"])
+        amounts[key] = amounts.get(key, 0) + item["amount"]
+    return {
+        **record,
+        "tags": list(dict.fromkeys(record["tags"])),
+        "ingredients": [
+            {"name": name, "measurement_unit": unit, "amount": amount}
+            for (name, unit), amount in amounts.items()
+        ],
+    }
+
+
+def _missing_reference(record, author_ids, tag_ids, ingredient_ids):
+    if record["author"] not in author_ids:
+        return f"unknown author {record['author']!r}"
+    for slug in record["tags"]:
+        if slug not in tag_ids:
+            return f"unknown tag {slug!r}"
+    for item in record["ingredients"]:
+        key = (item.get("name"), item.get("measurement_unit"))
+        if key not in ingredient_ids:
+            return "unknown ingredient {!r} ({})".format(*key)
+    return None
+
+
+@transaction.atomic
+def _create_batch(records, author_ids, tag_ids, ingredient_ids):
+    if not records:
+        return 0
+    recipes = [
+        Recipe(
+            author_id=author_ids[record["author"]],
+            name=record["name"],
+            text=record["text"],
+            image=record["image"],
+            cooking_time=record["cooking_time"],
+        )
+        for record in records
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+    else:
+        # without RETURNING bulk_create leaves pk empty (sqlite on 3.2).
+        for recipe in recipes:
+            recipe.save()
+    # pub_at is auto_now_add, so the exported value is put back afterwards.
+    for recipe, record in zip(recipes, records):
+        recipe.pub_at = datetime.fromisoformat(record["pub_at"])
+    Recipe.objects.bulk_update(recipes, ["pub_at"])
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient_id=ingredient_ids[
+                (item["name"], item["measurement_unit"])
+            ],
+            amount=item["amount"],
+        )
+        for recipe, record in zip(recipes, records)
+        for item in record["ingredients"]
+    )
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe_id=recipe.id, tag_id=tag_ids[slug])
+        for recipe, record in zip(recipes, records)
+        for slug in record["tags"]
+    )
+    return len(recipes)
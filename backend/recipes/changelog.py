@@ -0,0 +1,147 @@
+"""
+Change log behind /api/sync/.
+
+Write paths call record() in the transaction of the change. Every row
+keeps the id of the transaction that wrote it, and the cursor is a
+transaction id. Transactions commit out of id order, so on PostgreSQL
+readers only return rows of transactions below the xmin of their
+snapshot: those have all ended, no row below it can appear later, and
+writers never wait for each other. Other databases serialize writers.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Change
+
+USER_KINDS = (Change.FAVORITE, Change.SHOPPING_CART, Change.SUBSCRIPTION)
+
+
+def transaction_id():
+    """id of the current transaction, or the next one off PostgreSQL."""
+    if connection.vendor == "postgresql":
+        return RawSQL("pg_current_xact_id()::text::bigint", [])
+    return (Change.objects.aggregate(txid=Max("txid"))["txid"] or 0) + 1
+
+
+def snapshot_xmin():
+    """transactions below it have ended; None off PostgreSQL."""
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+        )
+        return cursor.fetchone()[0]
+
+
+def record(kind, object_ids, user=None, deleted=False):
+    """append changes of objects, per user for favorites, cart, follows."""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    # a savepoint would cost two more queries on every logged write.
+    with transaction.atomic(savepoint=False):
+        txid = transaction_id()
+        Change.objects.bulk_create(
+            Change(
+                txid=txid,
+                kind=kind,
+                object_id=object_id,
+                user=user,
+                deleted=deleted,
+            )
+            for object_id in object_ids
+        )
+
+
+def current_cursor():
+    """a cursor after every change a reader can see now."""
+    xmin = snapshot_xmin()
+    if xmin is not None:
+        return xmin - 1
+    return Change.objects.aggregate(cursor=Max("txid"))["cursor"] or 0
+
+
+def horizon():
+    """cursors below it may have missed tombstones dropped by compact()."""
+    return (
+        Change.objects.filter(kind=Change.COMPACTION).aggregate(
+            horizon=Max("object_id")
+        )["horizon"]
+        or 0
+    )
+
+
+def changes_since(user, since, limit):
+    """
+    about limit changes visible to user after since, and whether more.
+
+    only the last change of every object is returned. transactions are
+    never split, so one larger than limit comes whole.
+    """
+    changes = Change.objects.filter(txid__gt=since).filter(
+        Q(kind=Change.RECIPE, user__isnull=True)
+        | Q(kind__in=USER_KINDS, user=user)
+    )
+    xmin = snapshot_xmin()
+    if xmin is not None:
+        changes = changes.filter(txid__lt=xmin)
+    columns = ("txid", "kind", "object_id", "deleted")
+    rows = list(changes.values_list(*columns)[: limit + 1])
+    has_more = len(rows) > limit
+    if has_more:
+        cut = rows[limit][0]
+        rows = [row for row in rows if row[0] != cut] or list(
+            changes.filter(txid=cut).values_list(*columns)
+        )
+        cursor = rows[-1][0]
+    elif xmin is not None:
+        # every transaction below xmin was read, with changes or not.
+        cursor = max(since, xmin - 1)
+    else:
+        cursor = rows[-1][0] if rows else since
+    latest = {}
+    for txid, kind, object_id, deleted in rows:
+        latest.pop((kind, object_id), None)
+        latest[(kind, object_id)] = deleted
+    return latest, cursor, has_more
+
+
+def compact(retention):
+    """
+    drop superseded changes and tombstones older than retention.
+
+    returns the number of deleted rows. superseded changes are never
+    needed: the newer one is after every cursor the old one is. dropping
+    tombstones moves horizon() past their transactions.
+    """
+    newer = Change.objects.filter(
+        Q(txid__gt=OuterRef("txid"))
+        | Q(txid=OuterRef("txid"), id__gt=OuterRef("id")),
+        kind=OuterRef("kind"),
+        object_id=OuterRef("object_id"),
+    )
+    deleted, _ = Change.objects.filter(
+        Exists(newer.filter(user__isnull=True)), user__isnull=True
+    ).delete()
+    count, _ = Change.objects.filter(
+        Exists(newer.filter(user=OuterRef("user"))), user__isnull=False
+    ).delete()
+    deleted += count
+
+    tombstones = Change.objects.filter(
+        deleted=True, created_at__lt=timezone.now() - timedelta(days=retention)
+    )
+    with transaction.atomic():
+        last = tombstones.aggregate(last=Max("txid"))["last"]
+        if last is not None:
+            count, _ = tombstones.filter(txid__lte=last).delete()
+            deleted += count
+            previous = horizon()
+            Change.objects.filter(kind=Change.COMPACTION).delete()
+            record(Change.COMPACTION, [max(last, previous)])
+    return deleted
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import FeedEntry, Recipe, Subscription, User
+
+
+def has_materialized_feed(user):
+    """users following many authors read the feed from FeedEntry."""
+    return user.following_count >= settings.FEED_MATERIALIZE_MIN_FOLLOWING
+
+
+def feed_queryset(user, queryset):
+    """
+    limit recipes queryset to the user's feed.
+
+    rows get feed_pub_at annotation, so both paths share one ordering.
+    """
+    if has_materialized_feed(user):
+        return queryset.filter(feed_entries__user=user).annotate(
+            feed_pub_at=F("feed_entries__pub_at")
+        )
+    return queryset.filter(author__followers__user=user).annotate(
+        feed_pub_at=F("pub_at")
+    )
+
+
+def add_to_feed(user_id, recipes):
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_at=pub_at)
+            for recipe_id, pub_at in recipes.values_list("id", "pub_at")
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_feed(user_id):
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    add_to_feed(
+        user_id, Recipe.objects.filter(author__followers__user_id=user_id)
+    )
+
+
+def fan_out_recipe(recipe):
+    """add new recipe to materialized feeds of the author's followers."""
+    user_ids = Subscription.objects.filter(
+        following=recipe.author_id,
+        user__following_count__gte=settings.FEED_MATERIALIZE_MIN_FOLLOWING,
+    ).values_list("user", flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe=recipe, pub_at=recipe.pub_at)
+            for user_id in user_ids
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def count_following(user_id, delta):
+    """add delta to the user's following_count, return the new count."""
+    users = User.objects.filter(pk=user_id)
+    users.update(following_count=F("following_count") + delta)
+    # gone when the subscription is deleted with its user.
+    return users.values_list("following_count", flat=True).first() or 0
+
+
+def recount_following():
+    """repair following_count after subscriptions changed without signals."""
+    counts = (
+        Subscription.objects.filter(user=OuterRef("pk"))
+        .values("user")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    User.objects.update(following_count=Coalesce(Subquery(counts), 0))
+
+
+def on_subscribe(user_id, author_id):
+    count = count_following(user_id, 1)
+    if count == settings.FEED_MATERIALIZE_MIN_FOLLOWING:
+        rebuild_feed(user_id)
+    elif count > settings.FEED_MATERIALIZE_MIN_FOLLOWING:
+        add_to_feed(user_id, Recipe.objects.filter(author=author_id))
+
+
+def on_unsubscribe(user_id, author_id):
+    entries = FeedEntry.objects.filter(user=user_id)
+    count = count_following(user_id, -1)
+    if count >= settings.FEED_MATERIALIZE_MIN_FOLLOWING:
+        entries = entries.filter(recipe__author=author_id)
+    entries.delete()
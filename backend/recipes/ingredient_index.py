@@ -0,0 +1,213 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .models import RecipeIngredient
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+class IngredientIndex:
+    """
+    in-memory inverted index: ingredient id -> sorted array of recipe ids.
+
+    every worker process keeps its own copy. changes made in this process
+    are applied through signals; changes from other workers are picked up
+    by scanning RecipeIngredient rows newer than the last seen id, and a
+    periodic full rebuild drops whatever the scan can't see (deleted
+    recipes, in-place edits from admin).
+
+    updates build new postings and sizes and swap them in under _lock, so
+    a search reads a consistent pair; _update_lock lets one thread update
+    at a time while others search the current copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._postings = {}
+        self._recipes = {}
+        self._sizes = np.zeros(0, dtype=np.int32)
+        self._max_row_id = 0
+        self._pending = set()
+        self._built_at = None
+        self._synced_at = None
+
+    def mark_dirty(self, recipe_id):
+        with self._lock:
+            self._pending.add(recipe_id)
+
+    def sync(self):
+        # only the first build is waited for; later on a thread finding
+        # another one updating searches the current copy.
+        if not self._update_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            now = time.monotonic()
+            if self._built_at is None or (
+                now - self._built_at
+                > settings.INGREDIENT_INDEX_REBUILD_INTERVAL
+            ):
+                self._rebuild()
+            elif self._pending or (
+                now - self._synced_at > settings.INGREDIENT_INDEX_SYNC_INTERVAL
+            ):
+                self._sync_changes()
+        finally:
+            self._update_lock.release()
+
+    def rebuild(self):
+        with self._update_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        rows = np.array(
+            list(
+                RecipeIngredient.objects.values_list(
+                    "id", "ingredient_id", "recipe_id"
+                )
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        row_ids, ingredients, recipes = rows.T
+
+        order = np.lexsort((recipes, ingredients))
+        ingredients, recipes = ingredients[order], recipes[order]
+        bounds = np.flatnonzero(np.diff(ingredients)) + 1
+        postings = {
+            int(chunk_ingredients[0]): chunk_recipes
+            for chunk_ingredients, chunk_recipes in zip(
+                np.split(ingredients, bounds), np.split(recipes, bounds)
+            )
+            if len(chunk_ingredients)
+        }
+
+        recipe_map = {}
+        for ingredient_id, recipe_id in zip(
+            ingredients.tolist(), recipes.tolist()
+        ):
+            recipe_map.setdefault(recipe_id, []).append(ingredient_id)
+        sizes = np.bincount(
+            recipes, minlength=int(recipes.max(initial=0)) + 1
+        ).astype(np.int32)
+
+        with self._lock:
+            self._postings = postings
+            self._recipes = {
+                recipe_id: frozenset(ingredient_ids)
+                for recipe_id, ingredient_ids in recipe_map.items()
+            }
+            self._sizes = sizes
+            self._max_row_id = int(row_ids.max(initial=0))
+            self._pending = set()
+            self._built_at = self._synced_at = time.monotonic()
+
+    def _sync_changes(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            max_row_id = self._max_row_id
+        new_rows = RecipeIngredient.objects.filter(id__gt=max_row_id)
+        pending.update(new_rows.values_list("recipe_id", flat=True))
+
+        current = {}
+        rows = RecipeIngredient.objects.filter(recipe__in=pending)
+        for row_id, recipe_id, ingredient_id in rows.values_list(
+            "id", "recipe_id", "ingredient_id"
+        ):
+            current.setdefault(recipe_id, set()).add(ingredient_id)
+            max_row_id = max(max_row_id, row_id)
+
+        # only this thread writes (_update_lock), so the copies are made
+        # outside _lock and swapped in together.
+        postings, recipes = dict(self._postings), dict(self._recipes)
+        sizes = self._sizes.copy()
+        for recipe_id in pending:
+            sizes = self._replace(
+                postings,
+                recipes,
+                sizes,
+                recipe_id,
+                frozenset(current.get(recipe_id, ())),
+            )
+        with self._lock:
+            self._postings, self._recipes, self._sizes = (
+                postings,
+                recipes,
+                sizes,
+            )
+            self._max_row_id = max_row_id
+            self._synced_at = time.monotonic()
+
+    def _replace(self, postings, recipes, sizes, recipe_id, ingredient_ids):
+        """apply one recipe's ingredients to copies, return the sizes."""
+        old_ids = recipes.get(recipe_id, frozenset())
+        for ingredient_id in old_ids - ingredient_ids:
+            posting = postings[ingredient_id]
+            postings[ingredient_id] = posting[posting != recipe_id]
+        for ingredient_id in ingredient_ids - old_ids:
+            posting = postings.get(ingredient_id, EMPTY)
+            postings[ingredient_id] = np.insert(
+                posting, np.searchsorted(posting, recipe_id), recipe_id
+            )
+
+        if ingredient_ids:
+            recipes[recipe_id] = ingredient_ids
+        else:
+            recipes.pop(recipe_id, None)
+        if recipe_id >= len(sizes):
+            grown = np.zeros(recipe_id * 2 + 1, dtype=np.int32)
+            grown[: len(sizes)] = sizes
+            sizes = grown
+        sizes[recipe_id] = len(ingredient_ids)
+        return sizes
+
+    def search(self, ingredient_ids, limit, max_missing=None):
+        """
+        rank recipes by how many of their ingredients the user has.
+
+        return list of (recipe_id, matched, missing) tuples, fewest missing
+        ingredients first, then by the share of ingredients covered.
+        """
+        self.sync()
+        with self._lock:
+            index, sizes = self._postings, self._sizes
+        postings = [
+            index[ingredient_id]
+            for ingredient_id in set(ingredient_ids)
+            if ingredient_id in index
+        ]
+        if not postings:
+            return []
+
+        recipe_ids, matched = np.unique(
+            np.concatenate(postings), return_counts=True
+        )
+        missing = sizes[recipe_ids] - matched
+        if max_missing is not None:
+            keep = missing <= max_missing
+            recipe_ids, matched, missing = (
+                recipe_ids[keep],
+                matched[keep],
+                missing[keep],
+            )
+
+        # coverage is in (0, 1], so it only breaks ties on missing count
+        key = missing + (1 - matched / (matched + missing)) / 2
+        if len(key) > limit:
+            kth = np.partition(key, limit - 1)[limit - 1]
+            top = np.flatnonzero(key <= kth)
+        else:
+            top = np.arange(len(key))
+        top = top[np.lexsort((-recipe_ids[top], key[top]))][:limit]
+        return list(
+            zip(
+                recipe_ids[top].tolist(),
+                matched[top].tolist(),
+                missing[top].tolist(),
+            )
+        )
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.changelog import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop superseded /api/sync/ changes and tombstones older than "
+        "CHANGE_LOG_RETENTION_DAYS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.CHANGE_LOG_RETENTION_DAYS
+        )
+
+    def handle(self, *args, **options):
+        deleted = compact(options["days"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{deleted} changes compacted")
+        )
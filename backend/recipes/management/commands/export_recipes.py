@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from recipes.backup import CHUNK_SIZE, export_lines
+
+
+class Command(BaseCommand):
+    help = "Export recipes with ingredients and tags as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output",
+            nargs="?",
+            default="-",
+            help="File to write to, '-' for stdout",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Recipes fetched from the database at a time",
+        )
+
+    def handle(self, *args, **options):
+        lines = export_lines(chunk_size=options["chunk_size"])
+        if options["output"] == "-":
+            count = self._write(sys.stdout, lines)
+        else:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                count = self._write(file, lines)
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} recipes"))
+
+    def _write(self, file, lines):
+        count = 0
+        for line in lines:
+            file.write(line)
+            count += 1
+        return count
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.feeds import rebuild_feed, recount_following
+from recipes.models import FeedEntry, User
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized feeds of users following many authors"
+
+    def handle(self, *args, **kwargs):
+        recount_following()
+        user_ids = list(
+            User.objects.filter(
+                following_count__gte=settings.FEED_MATERIALIZE_MIN_FOLLOWING
+            ).values_list("pk", flat=True)
+        )
+        FeedEntry.objects.exclude(user__in=user_ids).delete()
+        for user_id in user_ids:
+            rebuild_feed(user_id)
+        self.stdout.write(
+            self.style.SUCCESS(f"Feeds rebuilt for {len(user_ids)} users")
+        )
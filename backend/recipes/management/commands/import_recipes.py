@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from recipes.backup import CHUNK_SIZE, import_lines
+
+
+class Command(BaseCommand):
+    help = "Import recipes from an NDJSON file made by export_recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "input",
+            nargs="?",
+            default="-",
+            help="File to read from, '-' for stdin",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Recipes inserted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        self.skipped = 0
+        if options["input"] == "-":
+            count = self._import(sys.stdin, options["batch_size"])
+        else:
+            with open(options["input"], encoding="utf-8") as file:
+                count = self._import(file, options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {count} recipes, skipped {self.skipped}"
+            )
+        )
+        if count:
+            self.stdout.write(
+                "Run feed_update, ranking_update --full and "
+                "similarity_update to include them in feeds and rankings"
+            )
+
+    def _import(self, file, batch_size):
+        return import_lines(file, batch_size=batch_size, on_skip=self._skip)
+
+    def _skip(self, line_no, reason):
+        self.skipped += 1
+        self.stderr.write(f"line {line_no}: {reason}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from recipes.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = "Refresh popular and trending recipe rankings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute all recipes instead of recently touched ones",
+        )
+
+    def handle(self, *args, **options):
+        count = refresh_rankings(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rankings refreshed for {count} recipes")
+        )
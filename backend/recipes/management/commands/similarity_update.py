@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from recipes.similarity import similarity_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild MinHash index used by /api/recipes/{id}/similar/"
+
+    def handle(self, *args, **kwargs):
+        count = similarity_index.build()
+        self.stdout.write(
+            self.style.SUCCESS(f"Similarity index built for {count} recipes")
+        )
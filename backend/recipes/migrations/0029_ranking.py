@@ -0,0 +1,94 @@
+# Generated by Django 3.2 on 2026-10-19 10:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0028_feed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeRanking",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ranking",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "favorites_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Добавлений в избранное"
+                    ),
+                ),
+                (
+                    "carts_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Добавлений в корзину"
+                    ),
+                ),
+                (
+                    "popular_score",
+                    models.FloatField(default=0, verbose_name="Популярность"),
+                ),
+                (
+                    "trending_score",
+                    models.FloatField(
+                        null=True,
+                        verbose_name="Популярность с затуханием (log)",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(verbose_name="Дата пересчёта"),
+                ),
+            ],
+            options={
+                "verbose_name": "Рейтинг рецепта",
+                "verbose_name_plural": "Рейтинги рецептов",
+            },
+        ),
+        migrations.AddField(
+            model_name="favoriterecipe",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата добавления",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="shoppingcart",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата добавления",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="reciperanking",
+            index=models.Index(
+                fields=["-popular_score"], name="ranking_popular_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reciperanking",
+            index=models.Index(
+                fields=["-trending_score"], name="ranking_trending_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-19 10:40
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_favorites(apps, schema_editor):
+    FavoriteRecipe = apps.get_model("recipes", "FavoriteRecipe")
+    keep = (
+        FavoriteRecipe.objects.values("user", "recipe")
+        .annotate(keep_id=Min("id"))
+        .values("keep_id")
+    )
+    FavoriteRecipe.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0029_ranking"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_favorites, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="favoriterecipe",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="uniqueFavoriteRecipe"
+            ),
+        ),
+    ]
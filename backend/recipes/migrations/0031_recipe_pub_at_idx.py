@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-19 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0030_favoriterecipe_uniquefavoriterecipe"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-pub_at"], name="recipe_pub_at_idx"),
+        ),
+    ]
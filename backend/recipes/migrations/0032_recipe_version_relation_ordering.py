@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0031_recipe_pub_at_idx"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="recipeingredient",
+            options={
+                "ordering": ("id",),
+                "verbose_name": "Ингредиент в рецепте",
+                "verbose_name_plural": "Ингредиенты в рецепте",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="tag",
+            options={
+                "ordering": ("id",),
+                "verbose_name": "Тег",
+                "verbose_name_plural": "Теги",
+            },
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1,
+                editable=False,
+                help_text=(
+                    "Растёт при изменении рецепта, автора, тегов и "
+                    "ингредиентов."
+                ),
+                verbose_name="Версия",
+            ),
+        ),
+    ]
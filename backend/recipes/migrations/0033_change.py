@@ -0,0 +1,84 @@
+# Generated by Django 3.2 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0032_recipe_version_relation_ordering"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("recipe", "Рецепт"),
+                            ("favorite", "Избранное"),
+                            ("shopping_cart", "Список покупок"),
+                            ("subscription", "Подписка"),
+                            ("compaction", "Сжатие журнала"),
+                        ],
+                        max_length=16,
+                        verbose_name="Тип",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(verbose_name="Объект"),
+                ),
+                (
+                    "deleted",
+                    models.BooleanField(default=False, verbose_name="Удалён"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата изменения"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="changes",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Изменение",
+                "verbose_name_plural": "Изменения",
+                "ordering": ("id",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["user", "id"], name="change_user_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["kind", "object_id"], name="change_kind_object_idx"
+            ),
+        ),
+    ]
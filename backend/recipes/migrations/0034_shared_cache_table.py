@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-19 18:05
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # tables of the DatabaseCache aliases in CACHES, if any.
+    call_command(
+        "createcachetable",
+        database=schema_editor.connection.alias,
+        verbosity=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0033_change"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+def reset_cursors(apps, schema_editor):
+    # cursors handed out so far are row ids, older than any txid horizon.
+    Change = apps.get_model("recipes", "Change")
+    if not Change.objects.exists():
+        return
+    if schema_editor.connection.vendor == "postgresql":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT pg_current_xact_id()::text::bigint")
+            txid = cursor.fetchone()[0]
+    else:
+        txid = 1
+    Change.objects.create(kind="compaction", object_id=txid, txid=txid)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0034_shared_cache_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="change",
+            name="txid",
+            field=models.PositiveBigIntegerField(
+                default=0, verbose_name="Транзакция"
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterModelOptions(
+            name="change",
+            options={
+                "ordering": ("txid", "id"),
+                "verbose_name": "Изменение",
+                "verbose_name_plural": "Изменения",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="change",
+            name="change_user_id_idx",
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["user", "txid"], name="change_user_txid_idx"
+            ),
+        ),
+        migrations.RunPython(reset_cursors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-19 19:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_following(apps, schema_editor):
+    User = apps.get_model("recipes", "User")
+    Subscription = apps.get_model("recipes", "Subscription")
+    counts = (
+        Subscription.objects.filter(user=OuterRef("pk"))
+        .values("user")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    User.objects.update(following_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0035_change_txid"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="following_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Подписок"
+            ),
+        ),
+        migrations.RunPython(count_following, migrations.RunPython.noop),
+    ]
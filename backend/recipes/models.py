@@ -60,6 +60,11 @@ class User(AbstractUser):
         default=None,
     )
 
+    # kept by recipes.feeds on every subscription change.
+    following_count = models.PositiveIntegerField(
+        verbose_name="Подписок", default=0, editable=False
+    )
+
     class Meta:
         ordering = ("username",)
 
@@ -106,14 +111,40 @@ class Recipe(models.Model):
         auto_now_add=True, verbose_name="Дата публикации"
     )
 
+    version = models.PositiveIntegerField(
+        verbose_name="Версия",
+        default=1,
+        editable=False,
+        help_text=(
+            "Растёт при изменении рецепта, автора, тегов и ингредиентов."
+        ),
+    )
+
     class Meta:
         ordering = ["-pub_at"]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_at"], name="recipe_author_pub_at_idx"
+            ),
+            models.Index(fields=["-pub_at"], name="recipe_pub_at_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name}"
 
+    def save(self, *args, **kwargs):
+        # version is only raised with UPDATE (recipes.signals), so saving
+        # an instance loaded before the last change can not lower it.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "version"
+            ]
+        super().save(*args, **kwargs)
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -129,6 +160,7 @@ class Tag(models.Model):
     )
 
     class Meta:
+        ordering = ("id",)
         verbose_name = "Тег"
         verbose_name_plural = "Теги"
 
@@ -168,6 +200,7 @@ class RecipeIngredient(models.Model):
     amount = models.PositiveIntegerField()
 
     class Meta:
+        ordering = ("id",)
         verbose_name = "Ингредиент в рецепте"
         verbose_name_plural = "Ингредиенты в рецепте"
         constraints = [
@@ -193,6 +226,9 @@ class FavoriteRecipe(models.Model):
         related_name="favorited_by",
         verbose_name="Рецепт",
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата добавления"
+    )
 
     def __str__(self):
         return f"{self.user} {self.recipe}"
@@ -200,6 +236,11 @@ class FavoriteRecipe(models.Model):
     class Meta:
         verbose_name = "Избранный Рецепт"
         verbose_name_plural = "Избранные рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="uniqueFavoriteRecipe"
+            ),
+        ]
 
 
 class Subscription(models.Model):
@@ -246,8 +287,143 @@ class ShoppingCart(models.Model):
         related_name="cart",
         verbose_name="Корзина покупок",
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата добавления"
+    )
 
     class Meta:
         verbose_name = "Корзина покупок"
         verbose_name_plural = "Корзины покупок"
         unique_together = ("user", "recipe")
+
+
+class FeedEntry(models.Model):
+    """Materialized feed row: recipe of an author the user follows."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Пользователь",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    pub_at = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="uniqueFeedEntry"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_at"], name="feedentry_user_pub_at_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.recipe}"
+
+
+class RecipeRanking(models.Model):
+    """Precomputed popularity scores, refreshed by ranking_update."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ranking",
+        verbose_name="Рецепт",
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0, verbose_name="Добавлений в избранное"
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0, verbose_name="Добавлений в корзину"
+    )
+    popular_score = models.FloatField(
+        default=0, verbose_name="Популярность"
+    )
+    trending_score = models.FloatField(
+        null=True, verbose_name="Популярность с затуханием (log)"
+    )
+    updated_at = models.DateTimeField(verbose_name="Дата пересчёта")
+
+    class Meta:
+        verbose_name = "Рейтинг рецепта"
+        verbose_name_plural = "Рейтинги рецептов"
+        indexes = [
+            models.Index(
+                fields=["-popular_score"], name="ranking_popular_idx"
+            ),
+            models.Index(
+                fields=["-trending_score"], name="ranking_trending_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} {self.popular_score}"
+
+
+class Change(models.Model):
+    """
+    Append-only change log read by /api/sync/; txid is the cursor.
+
+    recipe changes are global (user is empty), favorites, shopping cart
+    and subscriptions changes belong to their user. object_id is the
+    recipe id, or the author id for subscriptions. Deletions are kept as
+    tombstones until compact_changes drops them.
+    """
+
+    RECIPE = "recipe"
+    FAVORITE = "favorite"
+    SHOPPING_CART = "shopping_cart"
+    SUBSCRIPTION = "subscription"
+    COMPACTION = "compaction"
+    KINDS = (
+        (RECIPE, "Рецепт"),
+        (FAVORITE, "Избранное"),
+        (SHOPPING_CART, "Список покупок"),
+        (SUBSCRIPTION, "Подписка"),
+        (COMPACTION, "Сжатие журнала"),
+    )
+
+    txid = models.PositiveBigIntegerField(verbose_name="Транзакция")
+    kind = models.CharField(
+        max_length=16, choices=KINDS, verbose_name="Тип"
+    )
+    object_id = models.PositiveBigIntegerField(verbose_name="Объект")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="changes",
+        verbose_name="Пользователь",
+    )
+    deleted = models.BooleanField(default=False, verbose_name="Удалён")
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата изменения"
+    )
+
+    class Meta:
+        ordering = ("txid", "id")
+        verbose_name = "Изменение"
+        verbose_name_plural = "Изменения"
+        indexes = [
+            models.Index(
+                fields=["user", "txid"], name="change_user_txid_idx"
+            ),
+            models.Index(
+                fields=["kind", "object_id"], name="change_kind_object_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
@@ -0,0 +1,141 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import FavoriteRecipe, Recipe, RecipeRanking, ShoppingCart
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+FAVORITE_WEIGHT = 1.0
+CART_WEIGHT = 0.5
+CHUNK_SIZE = 1000
+
+
+def _log_weight(weight, created_at):
+    """
+    log of weight * 2 ** (age from EPOCH / half-life).
+
+    scores grow instead of decaying, so trending order stays correct
+    without touching old rows; log keeps the numbers finite.
+    """
+    half_life = settings.RANKING_TRENDING_HALF_LIFE.total_seconds()
+    age = (created_at - EPOCH).total_seconds()
+    return math.log(weight) + age / half_life * math.log(2)
+
+
+def _log_add(a, b):
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _counts(model, recipe_ids):
+    return dict(
+        model.objects.filter(recipe__in=recipe_ids)
+        .values_list("recipe")
+        .annotate(Count("id"))
+        .order_by()
+    )
+
+
+def _trending(recipe_ids, since, until):
+    scores = defaultdict(lambda: None)
+    for model, weight in (
+        (FavoriteRecipe, FAVORITE_WEIGHT),
+        (ShoppingCart, CART_WEIGHT),
+    ):
+        events = model.objects.filter(
+            recipe__in=recipe_ids, created_at__lt=until
+        )
+        if since is not None:
+            events = events.filter(created_at__gte=since)
+        for recipe_id, created_at in events.values_list(
+            "recipe", "created_at"
+        ).iterator():
+            scores[recipe_id] = _log_add(
+                scores[recipe_id], _log_weight(weight, created_at)
+            )
+    return scores
+
+
+@transaction.atomic
+def _refresh_chunk(recipe_ids, since, now):
+    favorites = _counts(FavoriteRecipe, recipe_ids)
+    carts = _counts(ShoppingCart, recipe_ids)
+    trending = _trending(recipe_ids, since, now)
+    rankings = RecipeRanking.objects.select_for_update().in_bulk(recipe_ids)
+
+    to_create, to_update = [], []
+    for recipe_id in recipe_ids:
+        ranking = rankings.get(recipe_id)
+        if ranking is None:
+            ranking = RecipeRanking(recipe_id=recipe_id)
+            to_create.append(ranking)
+        else:
+            to_update.append(ranking)
+        ranking.favorites_count = favorites.get(recipe_id, 0)
+        ranking.carts_count = carts.get(recipe_id, 0)
+        ranking.popular_score = (
+            ranking.favorites_count * FAVORITE_WEIGHT
+            + ranking.carts_count * CART_WEIGHT
+        )
+        if since is None or trending[recipe_id] is not None:
+            ranking.trending_score = (
+                trending[recipe_id]
+                if since is None
+                else _log_add(ranking.trending_score, trending[recipe_id])
+            )
+        ranking.updated_at = now
+
+    RecipeRanking.objects.bulk_create(to_create)
+    RecipeRanking.objects.bulk_update(
+        to_update,
+        (
+            "favorites_count",
+            "carts_count",
+            "popular_score",
+            "trending_score",
+            "updated_at",
+        ),
+    )
+
+
+def refresh_rankings(full=False):
+    """
+    recompute rankings of recipes touched since the last refresh.
+
+    incremental runs pick up new favorites and cart entries; removals are
+    reflected once the recipe is touched again or on a full refresh.
+    return number of refreshed recipes.
+    """
+    now = timezone.now()
+    since = None
+    if not full:
+        since = RecipeRanking.objects.aggregate(since=Max("updated_at"))[
+            "since"
+        ]
+
+    if since is None:
+        recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+    else:
+        recipe_ids = set(
+            Recipe.objects.filter(ranking__isnull=True).values_list(
+                "id", flat=True
+            )
+        )
+        for model in (FavoriteRecipe, ShoppingCart):
+            recipe_ids.update(
+                model.objects.filter(
+                    created_at__gte=since, created_at__lt=now
+                ).values_list("recipe", flat=True)
+            )
+        recipe_ids = sorted(recipe_ids)
+
+    for start in range(0, len(recipe_ids), CHUNK_SIZE):
+        _refresh_chunk(recipe_ids[start:start + CHUNK_SIZE], since, now)
+    return len(recipe_ids)
@@ -0,0 +1,88 @@
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from foodgram import events
+
+from . import feeds
+from .ingredient_index import ingredient_index
+from .models import (Ingredient, Recipe, RecipeIngredient, Subscription, Tag,
+                     User)
+
+# user fields shown with their recipes; saving others (last_login on
+# every login) leaves the recipes' versions alone.
+AUTHOR_FIELDS = {"email", "username", "first_name", "last_name", "avatar"}
+
+
+def bump_versions(recipes):
+    recipes.update(version=F("version") + 1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        feeds.fan_out_recipe(instance)
+        events.publish_recipe(instance)
+    else:
+        bump_versions(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        feeds.on_subscribe(instance.user_id, instance.following_id)
+        events.publish_subscription(
+            instance.user_id, instance.following_id, True
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    feeds.on_unsubscribe(instance.user_id, instance.following_id)
+    events.publish_subscription(instance.user_id, instance.following_id, False)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    ingredient_index.mark_dirty(instance.recipe_id)
+    bump_versions(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    ingredient_index.mark_dirty(instance.id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        bump_versions(Recipe.objects.filter(pk=instance.pk))
+    elif action == "pre_clear":
+        bump_versions(Recipe.objects.filter(tags=instance))
+    else:
+        bump_versions(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    bump_versions(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        bump_versions(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_versions(
+            Recipe.objects.filter(recipeingredient__ingredient=instance)
+        )
@@ -0,0 +1,272 @@
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .models import Recipe, RecipeIngredient
+
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+PRIME = (1 << 31) - 1
+TAG_OFFSET = 1 << 30
+
+_rng = np.random.default_rng(20241003)
+HASH_A = _rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)
+HASH_B = _rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)
+BAND_MULT = _rng.integers(1, 1 << 63, ROWS, dtype=np.uint64)
+
+
+def signature(ingredient_ids, tag_ids):
+    """minhash of the recipe's ingredient and tag ids."""
+    features = np.fromiter(
+        [*ingredient_ids, *(TAG_OFFSET + tag_id for tag_id in tag_ids)],
+        dtype=np.uint64,
+    ) % PRIME
+    if not len(features):
+        return np.full(NUM_PERM, PRIME, dtype=np.uint32)
+    hashes = (np.outer(features, HASH_A) + HASH_B) % PRIME
+    return hashes.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signatures):
+    """one uint64 LSH bucket key per band: shape (bands, n)."""
+    rows = signatures.reshape(-1, BANDS, ROWS).astype(np.uint64)
+    return (rows * BAND_MULT).sum(axis=2).T
+
+
+def recipe_features(recipe_ids=None):
+    """yield (recipe_id, ingredient_ids, tag_ids) read from the database."""
+    ingredients = RecipeIngredient.objects.order_by("recipe_id")
+    tags = Recipe.tags.through.objects.order_by("recipe_id")
+    recipes = Recipe.objects.order_by("id")
+    if recipe_ids is not None:
+        ingredients = ingredients.filter(recipe__in=recipe_ids)
+        tags = tags.filter(recipe__in=recipe_ids)
+        recipes = recipes.filter(id__in=recipe_ids)
+
+    grouped = {}
+    for recipe_id, ingredient_id in ingredients.values_list(
+        "recipe_id", "ingredient_id"
+    ).iterator():
+        grouped.setdefault(recipe_id, ([], []))[0].append(ingredient_id)
+    for recipe_id, tag_id in tags.values_list(
+        "recipe_id", "tag_id"
+    ).iterator():
+        grouped.setdefault(recipe_id, ([], []))[1].append(tag_id)
+    for recipe_id in recipes.values_list("id", flat=True).iterator():
+        ingredient_ids, tag_ids = grouped.get(recipe_id, ((), ()))
+        yield recipe_id, ingredient_ids, tag_ids
+
+
+class SimilarityIndex:
+    """
+    MinHash/LSH index of recipes, persisted as memory-mapped numpy files.
+
+    SIMILARITY_INDEX_DIR/CURRENT names the active build directory with
+    ids, signatures and per-band sorted bucket keys; workers map it
+    read-only, so startup is cheap and pages are shared. recipes saved
+    after the build are written to delta/ as one small file each and
+    merged by the next similarity_update run, which cron must start
+    regularly: every refresh scans delta/. only new or replaced delta
+    files are read. the previous build is kept for workers that read
+    CURRENT before it moved on.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._build = None
+        self._arrays = (
+            np.empty(0, dtype=np.int64),
+            np.empty((0, NUM_PERM), dtype=np.uint32),
+            np.empty((BANDS, 0), dtype=np.uint64),
+            np.empty((BANDS, 0), dtype=np.int64),
+        )
+        self._delta = {}
+        # (inode, mtime) of every loaded delta file by recipe id.
+        self._delta_files = {}
+        self._loaded_at = None
+
+    @property
+    def root(self):
+        return str(self.path or settings.SIMILARITY_INDEX_DIR)
+
+    @property
+    def delta_dir(self):
+        return os.path.join(self.root, "delta")
+
+    def build(self):
+        """write a fresh build from the database and make it current."""
+        started = time.time()
+        ids, signatures = [], []
+        for recipe_id, ingredient_ids, tag_ids in recipe_features():
+            ids.append(recipe_id)
+            signatures.append(signature(ingredient_ids, tag_ids))
+        ids = np.array(ids, dtype=np.int64)
+        signatures = np.array(signatures, dtype=np.uint32).reshape(
+            -1, NUM_PERM
+        )
+        keys = band_keys(signatures)
+        rows = np.argsort(keys, axis=1, kind="stable")
+
+        name = f"build-{int(started * 1000)}"
+        build_dir = os.path.join(self.root, name)
+        os.makedirs(build_dir)
+        np.save(os.path.join(build_dir, "ids.npy"), ids)
+        np.save(os.path.join(build_dir, "signatures.npy"), signatures)
+        np.save(
+            os.path.join(build_dir, "band_keys.npy"),
+            np.take_along_axis(keys, rows, axis=1),
+        )
+        np.save(os.path.join(build_dir, "band_rows.npy"), rows)
+
+        previous = self._current_name()
+        pointer = os.path.join(self.root, "CURRENT.tmp")
+        with open(pointer, "w") as file:
+            file.write(name)
+        os.replace(pointer, os.path.join(self.root, "CURRENT"))
+
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name.startswith("build-"):
+                if entry.name not in (name, previous):
+                    _remove_tree(entry.path)
+        if os.path.isdir(self.delta_dir):
+            for entry in os.scandir(self.delta_dir):
+                if entry.stat().st_mtime < started:
+                    os.remove(entry.path)
+        return len(ids)
+
+    def update_saved(self, recipe_id):
+        """update with the ingredients and tags stored for the recipe."""
+        for _, ingredient_ids, tag_ids in recipe_features([recipe_id]):
+            self.update(recipe_id, ingredient_ids, tag_ids)
+
+    def update(self, recipe_id, ingredient_ids, tag_ids):
+        """store signature of a saved recipe for every worker."""
+        recipe_signature = signature(ingredient_ids, tag_ids)
+        os.makedirs(self.delta_dir, exist_ok=True)
+        path = os.path.join(self.delta_dir, f"{recipe_id}.npy")
+        with open(path + ".tmp", "wb") as file:
+            np.save(file, recipe_signature)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._delta[recipe_id] = recipe_signature
+
+    def similar(self, recipe_id, limit):
+        """return up to limit (recipe_id, estimated jaccard) pairs."""
+        self.refresh()
+        ids, signatures, sorted_keys, sorted_rows = self._arrays
+        delta = self._delta
+        query = self._signature_of(recipe_id, ids, signatures, delta)
+        query_keys = band_keys(query[np.newaxis])[:, 0]
+
+        rows = set()
+        for band in range(BANDS):
+            keys = sorted_keys[band]
+            left = np.searchsorted(keys, query_keys[band], side="left")
+            right = np.searchsorted(keys, query_keys[band], side="right")
+            rows.update(sorted_rows[band, left:right].tolist())
+
+        candidates = {}
+        for row in rows:
+            candidate_id = int(ids[row])
+            if candidate_id not in delta:
+                candidates[candidate_id] = signatures[row]
+        candidates.update(delta)
+        candidates.pop(recipe_id, None)
+        if not candidates:
+            return []
+
+        candidate_ids = np.fromiter(candidates, dtype=np.int64)
+        scores = (np.array(list(candidates.values())) == query).mean(axis=1)
+        order = np.lexsort((-candidate_ids, -scores))[:limit]
+        return [
+            (int(candidate_ids[i]), float(scores[i]))
+            for i in order
+            if scores[i] > 0
+        ]
+
+    def _signature_of(self, recipe_id, ids, signatures, delta):
+        if recipe_id in delta:
+            return delta[recipe_id]
+        row = np.searchsorted(ids, recipe_id)
+        if row < len(ids) and ids[row] == recipe_id:
+            return np.asarray(signatures[row])
+        for _, ingredient_ids, tag_ids in recipe_features([recipe_id]):
+            return signature(ingredient_ids, tag_ids)
+        return signature((), ())
+
+    def refresh(self):
+        now = time.monotonic()
+        if (
+            self._loaded_at is not None
+            and now - self._loaded_at < settings.SIMILARITY_SYNC_INTERVAL
+        ):
+            return
+        with self._lock:
+            self._load_build()
+            self._load_delta()
+            self._loaded_at = now
+
+    def _current_name(self):
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _load_build(self, attempts=3):
+        name = self._current_name()
+        if name is None or name == self._build:
+            return
+        build_dir = os.path.join(self.root, name)
+
+        def load(filename):
+            return np.load(os.path.join(build_dir, filename), mmap_mode="r")
+
+        try:
+            arrays = (
+                load("ids.npy"),
+                load("signatures.npy"),
+                load("band_keys.npy"),
+                load("band_rows.npy"),
+            )
+        except FileNotFoundError:
+            # removed by a build two steps ahead: CURRENT names a newer one.
+            if attempts > 1:
+                self._load_build(attempts - 1)
+            return
+        self._arrays = arrays
+        self._build = name
+
+    def _load_delta(self):
+        delta, files = {}, {}
+        if os.path.isdir(self.delta_dir):
+            for entry in os.scandir(self.delta_dir):
+                if not entry.name.endswith(".npy"):
+                    continue
+                recipe_id = int(entry.name[:-4])
+                try:
+                    stat = entry.stat()
+                    # update() replaces files, so a new one has a new inode.
+                    files[recipe_id] = (stat.st_ino, stat.st_mtime_ns)
+                    if self._delta_files.get(recipe_id) == files[recipe_id]:
+                        delta[recipe_id] = self._delta[recipe_id]
+                    else:
+                        delta[recipe_id] = np.load(entry.path)
+                except FileNotFoundError:
+                    # merged and removed by a build meanwhile.
+                    files.pop(recipe_id, None)
+        self._delta, self._delta_files = delta, files
+
+
+def _remove_tree(path):
+    for entry in os.scandir(path):
+        os.remove(entry.path)
+    os.rmdir(path)
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,31 @@
+import pytest
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from foodgram.db.pool import close_pools
+from tests.utils import IMAGE, IMAGE_NAME
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """media and the similarity index in a temporary directory."""
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.SIMILARITY_INDEX_DIR = str(tmp_path / "similarity_index")
+    (tmp_path / IMAGE_NAME).write_bytes(IMAGE)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """cached pages, counts and fragments must not outlive a test."""
+    for cache in caches.all():
+        # other backends may be shared stores the tests do not own.
+        if isinstance(cache, LocMemCache):
+            cache.clear()
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup):
+    """close every pooled connection so the test database can be dropped."""
+    yield
+    close_pools()
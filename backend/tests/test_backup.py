@@ -0,0 +1,84 @@
+import json
+
+from django.test import TestCase
+
+from recipes.backup import export_lines, import_lines
+from recipes.models import Recipe
+from tests.utils import (create_ingredient, create_recipe, create_tag,
+                         create_user)
+
+
+class ImportTest(TestCase):
+    def setUp(self):
+        self.author = create_user("author")
+        self.salt = create_ingredient("Соль")
+        self.pepper = create_ingredient("Перец")
+        self.tag = create_tag("lunch")
+        recipe = create_recipe(
+            self.author,
+            ingredients=[(self.salt, 5), (self.pepper, 1)],
+            tags=[self.tag],
+        )
+        self.record = json.loads(next(export_lines()))
+        recipe.delete()
+
+    def line(self, **changes):
+        return json.dumps({**self.record, **changes}) + "\n"
+
+    def ingredient(self, amount, name="Соль"):
+        return {"name": name, "measurement_unit": "г", "amount": amount}
+
+    def test_bad_lines_are_skipped_without_aborting_the_batch(self):
+        bad = [
+            self.line(cooking_time=0),
+            self.line(cooking_time="10"),
+            self.line(cooking_time=2 ** 31),
+            self.line(pub_at="yesterday"),
+            self.line(name="x" * 300),
+            self.line(author=["author"]),
+            self.line(tags="lunch"),
+            self.line(ingredients=[self.ingredient(-1)]),
+            self.line(ingredients=[self.ingredient(1.5)]),
+            self.line(ingredients=[{"amount": 1}]),
+            self.line(
+                ingredients=[self.ingredient(2 ** 31 - 1), self.ingredient(1)]
+            ),
+            self.line(author="nobody"),
+            "{not json\n",
+        ]
+        skipped = []
+        created = import_lines(
+            [self.line(), *bad, self.line(name="Второй")],
+            on_skip=lambda line_no, reason: skipped.append(line_no),
+        )
+        self.assertEqual(created, 2)
+        self.assertEqual(sorted(skipped), list(range(2, len(bad) + 2)))
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("name", flat=True)),
+            ["Второй", "Рецепт"],
+        )
+
+    def test_repeated_tags_and_ingredients_are_merged(self):
+        created = import_lines(
+            [
+                self.line(
+                    tags=["lunch", "lunch"],
+                    ingredients=[
+                        self.ingredient(5),
+                        self.ingredient(1, "Перец"),
+                        self.ingredient(3),
+                    ],
+                )
+            ]
+        )
+        self.assertEqual(created, 1)
+        recipe = Recipe.objects.get()
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(
+            list(
+                recipe.recipeingredient_set.order_by("id").values_list(
+                    "ingredient__name", "amount"
+                )
+            ),
+            [("Соль", 8), ("Перец", 1)],
+        )
@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FavoriteRecipe, ShoppingCart
+from tests.utils import client_for, create_recipe, create_tag, create_user
+
+
+class BatchTest(TestCase):
+    def setUp(self):
+        self.user = create_user("reader")
+        self.client = client_for(self.user)
+        author = create_user("author")
+        self.lunch = create_tag("lunch")
+        self.ids = [
+            create_recipe(author, f"Рецепт {index}", tags=[self.lunch]).pk
+            for index in range(20)
+        ]
+
+    def queries(self, method, url, ids):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(
+                url, {"ids": ids}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assert_constant_queries(self, url, model):
+        few, many = self.ids[:2], self.ids[2:]
+        added = [
+            self.queries("post", url, few),
+            self.queries("post", url, many),
+        ]
+        self.assertEqual(added[0], added[1])
+        self.assertEqual(model.objects.filter(user=self.user).count(), 20)
+        removed = [
+            self.queries("delete", url, few),
+            self.queries("delete", url, many),
+        ]
+        self.assertEqual(removed[0], removed[1])
+        self.assertLessEqual(removed[1], added[1])
+        self.assertFalse(model.objects.filter(user=self.user).exists())
+
+    def test_favorite_queries_do_not_grow_with_ids(self):
+        self.assert_constant_queries(
+            "/api/recipes/batch/favorite/", FavoriteRecipe
+        )
+
+    def test_shopping_cart_queries_do_not_grow_with_ids(self):
+        self.assert_constant_queries(
+            "/api/recipes/batch/shopping_cart/", ShoppingCart
+        )
+
+    def test_batch_delete_drops_facets_of_the_user(self):
+        url = "/api/recipes/batch/favorite/"
+        self.client.post(url, {"ids": self.ids}, format="json")
+        facets = "/api/recipes/facets/?is_favorited=1"
+        self.assertEqual(self.client.get(facets).data["tags"][0]["count"], 20)
+        self.client.delete(url, {"ids": self.ids[:5]}, format="json")
+        self.assertEqual(self.client.get(facets).data["tags"][0]["count"], 15)
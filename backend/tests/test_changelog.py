@@ -0,0 +1,178 @@
+import threading
+import unittest
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from recipes import changelog
+from recipes.models import Change, FavoriteRecipe
+from tests.utils import client_for, create_recipe, create_user
+
+URL = "/api/sync/"
+
+
+class ChangelogTest(TransactionTestCase):
+    def setUp(self):
+        self.user = create_user("reader")
+        self.other = create_user("other")
+
+    def test_changes_since_returns_last_change_of_every_object(self):
+        changelog.record(Change.FAVORITE, [3], self.other)
+        changelog.record(Change.RECIPE, [1, 2])
+        changelog.record(Change.FAVORITE, [1], self.user)
+        changelog.record(Change.FAVORITE, [1], self.user, deleted=True)
+        latest, cursor, has_more = changelog.changes_since(self.user, 0, 10)
+        self.assertEqual(
+            latest,
+            {
+                (Change.RECIPE, 1): False,
+                (Change.RECIPE, 2): False,
+                (Change.FAVORITE, 1): True,
+            },
+        )
+        self.assertFalse(has_more)
+        self.assertEqual(cursor, changelog.current_cursor())
+        self.assertEqual(
+            changelog.changes_since(self.user, cursor, 10), ({}, cursor, False)
+        )
+
+    def test_limit_never_splits_a_transaction(self):
+        changelog.record(Change.RECIPE, [1, 2, 3])
+        changelog.record(Change.RECIPE, [4])
+        latest, cursor, has_more = changelog.changes_since(self.user, 0, 2)
+        self.assertEqual(len(latest), 3)
+        self.assertTrue(has_more)
+        latest, cursor, has_more = changelog.changes_since(
+            self.user, cursor, 2
+        )
+        self.assertEqual(latest, {(Change.RECIPE, 4): False})
+        self.assertFalse(has_more)
+
+    @unittest.skipUnless(
+        connection.vendor == "postgresql", "snapshots need PostgreSQL"
+    )
+    def test_unfinished_transaction_holds_the_cursor_back(self):
+        recorded, release = threading.Event(), threading.Event()
+
+        def write():
+            try:
+                with transaction.atomic():
+                    changelog.record(Change.RECIPE, [1])
+                    recorded.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        try:
+            self.assertTrue(recorded.wait(10))
+            # commits first, with a later transaction id.
+            changelog.record(Change.RECIPE, [2])
+            latest, cursor, _ = changelog.changes_since(self.user, 0, 10)
+            self.assertEqual(latest, {})
+        finally:
+            release.set()
+            thread.join()
+        latest, _, _ = changelog.changes_since(self.user, cursor, 10)
+        self.assertEqual(
+            latest, {(Change.RECIPE, 1): False, (Change.RECIPE, 2): False}
+        )
+
+    def test_compact_drops_superseded_changes_and_old_tombstones(self):
+        changelog.record(Change.RECIPE, [1])
+        changelog.record(Change.RECIPE, [1])
+        changelog.record(Change.FAVORITE, [1], self.user)
+        changelog.record(Change.FAVORITE, [1], self.user, deleted=True)
+        changelog.record(Change.FAVORITE, [1], self.other)
+        self.assertEqual(changelog.compact(30), 2)
+        self.assertEqual(changelog.horizon(), 0)
+
+        tombstone = Change.objects.get(deleted=True)
+        Change.objects.filter(pk=tombstone.pk).update(
+            created_at=timezone.now() - timedelta(days=31)
+        )
+        self.assertEqual(changelog.compact(30), 1)
+        self.assertEqual(changelog.horizon(), tombstone.txid)
+        self.assertEqual(
+            sorted(Change.objects.values_list("kind", "user")),
+            [
+                (Change.COMPACTION, None),
+                (Change.FAVORITE, self.other.pk),
+                (Change.RECIPE, None),
+            ],
+        )
+
+
+class SyncViewTest(TransactionTestCase):
+    def setUp(self):
+        self.user = create_user("reader")
+        self.client = client_for(self.user)
+        self.author = create_user("author")
+        self.recipe = create_recipe(self.author)
+
+    def sync(self, since=None):
+        params = {} if since is None else {"since": since}
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_without_since_resets(self):
+        data = self.sync()
+        self.assertTrue(data["reset"])
+        self.assertEqual(data["cursor"], changelog.current_cursor())
+
+    def test_toggles_are_synced(self):
+        cursor = self.sync()["cursor"]
+        self.client.post(f"/api/recipes/{self.recipe.pk}/favorite/")
+        self.client.post(f"/api/users/{self.author.pk}/subscribe/")
+        data = self.sync(cursor)
+        self.assertFalse(data["reset"])
+        self.assertEqual(
+            data["favorites"], {"added": [self.recipe.pk], "removed": []}
+        )
+        self.assertEqual(
+            data["subscriptions"], {"added": [self.author.pk], "removed": []}
+        )
+
+        self.client.delete(f"/api/recipes/{self.recipe.pk}/favorite/")
+        data = self.sync(data["cursor"])
+        self.assertEqual(
+            data["favorites"], {"added": [], "removed": [self.recipe.pk]}
+        )
+        self.assertEqual(data["subscriptions"]["added"], [])
+
+    def test_recipe_changes_are_synced(self):
+        cursor = self.sync()["cursor"]
+        self.client.force_authenticate(self.author)
+        self.client.patch(
+            f"/api/recipes/{self.recipe.pk}/", {"name": "Новое имя"}
+        )
+        self.client.delete(f"/api/recipes/{self.recipe.pk}/")
+        self.client.force_authenticate(self.user)
+        data = self.sync(cursor)
+        self.assertEqual(data["recipes"], [])
+        self.assertEqual(data["deleted_recipes"], [self.recipe.pk])
+
+    def test_state_comes_from_the_tables(self):
+        cursor = self.sync()["cursor"]
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        # logged out of commit order by a concurrent transaction.
+        changelog.record(
+            Change.FAVORITE, [self.recipe.pk], self.user, deleted=True
+        )
+        data = self.sync(cursor)
+        self.assertEqual(
+            data["favorites"], {"added": [self.recipe.pk], "removed": []}
+        )
+
+    def test_cursor_outside_the_log_resets(self):
+        changelog.record(Change.RECIPE, [self.recipe.pk], deleted=True)
+        Change.objects.update(created_at=timezone.now() - timedelta(days=31))
+        changelog.compact(30)
+        cursor = changelog.current_cursor()
+        self.assertTrue(self.sync(changelog.horizon() - 1)["reset"])
+        self.assertTrue(self.sync(cursor + 1)["reset"])
+        self.assertFalse(self.sync(cursor)["reset"])
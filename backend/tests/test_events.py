@@ -0,0 +1,66 @@
+import json
+
+from foodgram.events import (RECIPES_CHANNEL, SUBSCRIPTIONS_CHANNEL, Hub,
+                             Stream, recipe_event)
+
+
+def publish(hub, recipe_id, author_id):
+    hub.dispatch(
+        RECIPES_CHANNEL,
+        json.dumps({"id": recipe_id, "author": author_id, "name": "Рецепт"}),
+    )
+
+
+def subscribe(hub, user_id, author_id, follows=True):
+    hub.dispatch(
+        SUBSCRIPTIONS_CHANNEL,
+        json.dumps({"user": user_id, "author": author_id, "follows": follows}),
+    )
+
+
+def event_ids(stream):
+    return [recipe_id for recipe_id, _ in stream.events]
+
+
+def test_recipes_published_while_loading_are_delivered():
+    hub, stream = Hub(), Stream(user_id=1)
+    hub.add(stream)
+    publish(hub, 10, author_id=2)
+    publish(hub, 11, author_id=3)
+    hub.follow(stream, [2])
+    publish(hub, 12, author_id=2)
+    assert event_ids(stream) == [10, 12]
+    assert stream.events[0][1] == recipe_event(
+        {"id": 10, "author": 2, "name": "Рецепт"}
+    )
+
+
+def test_subscription_changes_while_loading_override_the_read():
+    hub, stream = Hub(), Stream(user_id=1)
+    hub.add(stream)
+    subscribe(hub, 1, 2, follows=False)
+    subscribe(hub, 1, 3)
+    hub.follow(stream, [2])
+    assert stream.following == {3}
+    publish(hub, 10, author_id=2)
+    publish(hub, 11, author_id=3)
+    assert event_ids(stream) == [11]
+
+
+def test_replayed_recipes_are_not_sent_again():
+    hub, stream = Hub(), Stream(user_id=1)
+    hub.add(stream)
+    hub.follow(stream, [2])
+    publish(hub, 10, author_id=2)
+    stream.replay([9, 10])
+    publish(hub, 10, author_id=2)
+    publish(hub, 11, author_id=2)
+    assert event_ids(stream) == [11]
+
+
+def test_removed_stream_is_forgotten():
+    hub, stream = Hub(), Stream(user_id=1)
+    hub.add(stream)
+    hub.follow(stream, [2])
+    hub.remove(stream)
+    assert not hub.by_author and not hub.by_user and not hub.loading
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase
+
+from api.facets import bump_generation, generation_key
+from recipes.models import FavoriteRecipe, Recipe
+from tests.utils import client_for, create_recipe, create_tag, create_user
+
+URL = "/api/recipes/facets/"
+
+
+class FacetsTest(TestCase):
+    def setUp(self):
+        self.author = create_user("author")
+        self.user = create_user("reader")
+        self.lunch = create_tag("lunch")
+        self.dinner = create_tag("dinner")
+        self.recipe = create_recipe(self.author, tags=[self.lunch])
+
+    def counts(self, user=None, **params):
+        response = client_for(user).get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return {tag["slug"]: tag["count"] for tag in response.data["tags"]}
+
+    def test_new_recipe_drops_cached_counts(self):
+        self.assertEqual(self.counts(), {"lunch": 1, "dinner": 0})
+        create_recipe(self.author, tags=[self.lunch, self.dinner])
+        self.assertEqual(self.counts(), {"lunch": 2, "dinner": 1})
+
+    def test_favorite_drops_counts_of_its_user(self):
+        self.assertEqual(
+            self.counts(self.user, is_favorited=1), {"lunch": 0, "dinner": 0}
+        )
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(
+            self.counts(self.user, is_favorited=1), {"lunch": 1, "dinner": 0}
+        )
+
+    def test_generation_bump_makes_no_queries(self):
+        with self.assertNumQueries(0):
+            bump_generation()
+            bump_generation(self.user.pk)
+
+    def test_lost_generation_is_not_served_stale(self):
+        self.assertEqual(self.counts(), {"lunch": 1, "dinner": 0})
+        # tagged without signals, so nothing bumps the generation.
+        Recipe.tags.through.objects.create(
+            recipe=self.recipe, tag=self.dinner
+        )
+        caches[settings.FACET_CACHE].delete(generation_key())
+        self.assertEqual(self.counts(), {"lunch": 1, "dinner": 1})
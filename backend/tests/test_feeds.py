@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from recipes.feeds import has_materialized_feed
+from recipes.models import FeedEntry, Subscription
+from tests.utils import client_for, create_recipe, create_user
+
+URL = "/api/recipes/feed/"
+MOMENT = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+@override_settings(FEED_MATERIALIZE_MIN_FOLLOWING=2)
+class FeedTest(TestCase):
+    def setUp(self):
+        self.reader = create_user("reader")
+        self.first = create_user("first")
+        self.second = create_user("second")
+
+    def follow(self, author):
+        Subscription.objects.create(user=self.reader, following=author)
+        self.reader.refresh_from_db()
+
+    def publish(self, author, count):
+        # one pub_at for all: the feed orders them by id.
+        with mock.patch("django.utils.timezone.now", return_value=MOMENT):
+            return [
+                create_recipe(author, f"Рецепт {index}").pk
+                for index in range(count)
+            ]
+
+    def feed_ids(self):
+        """ids of every page of the feed, two recipes a page."""
+        client, ids, url = client_for(self.reader), [], f"{URL}?limit=2"
+        while url:
+            data = client.get(url).json()
+            ids += [recipe["id"] for recipe in data["results"]]
+            url = data["next"]
+        return ids
+
+    def test_both_paths_page_through_ties_by_id(self):
+        recipes = self.publish(self.first, 3) + self.publish(self.second, 2)
+        self.follow(self.first)
+        self.follow(self.second)
+        self.assertTrue(has_materialized_feed(self.reader))
+        expected = sorted(recipes, reverse=True)
+        self.assertEqual(self.feed_ids(), expected)
+        with override_settings(FEED_MATERIALIZE_MIN_FOLLOWING=100):
+            self.assertFalse(has_materialized_feed(self.reader))
+            self.assertEqual(self.feed_ids(), expected)
+
+    def test_subscriptions_materialize_and_drop_the_feed(self):
+        entries = FeedEntry.objects.filter(user=self.reader)
+        first = self.publish(self.first, 1)
+        self.follow(self.first)
+        self.assertEqual(self.reader.following_count, 1)
+        self.assertFalse(entries.exists())
+
+        self.follow(self.second)
+        self.assertEqual(self.reader.following_count, 2)
+        self.assertEqual(list(entries.values_list("recipe", flat=True)), first)
+        second = self.publish(self.second, 1)
+        self.assertEqual(entries.count(), 2)
+        self.assertEqual(self.feed_ids(), second + first)
+
+        Subscription.objects.filter(
+            user=self.reader, following=self.second
+        ).delete()
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.following_count, 1)
+        self.assertFalse(entries.exists())
+        self.assertEqual(self.feed_ids(), first)
+
+    def test_feed_path_is_chosen_without_queries(self):
+        with self.assertNumQueries(0):
+            has_materialized_feed(self.reader)
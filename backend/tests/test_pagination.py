@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from tests.utils import client_for, create_recipe, create_user
+
+URL = "/api/recipes/"
+
+
+class EstimatedCountTest(TestCase):
+    RECIPES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user("author")
+        for index in range(cls.RECIPES):
+            create_recipe(author, f"Рецепт {index}")
+
+    def page(self, estimate, number):
+        with mock.patch(
+            "api.pagination.estimated_count", return_value=estimate
+        ):
+            response = client_for().get(URL, {"limit": 2, "page": number})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Count-Exact"], "false")
+        data = response.json()
+        self.assertEqual(data["count"], estimate)
+        return data
+
+    def test_underestimate_does_not_end_the_list(self):
+        # 3 rows estimated would be 2 pages; 7 rows make 4.
+        for number in (2, 3):
+            data = self.page(3, number)
+            self.assertEqual(len(data["results"]), 2)
+            self.assertIn(f"page={number + 1}", data["next"])
+        data = self.page(3, 4)
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNone(data["next"])
+
+    def test_overestimate_ends_with_the_rows(self):
+        data = self.page(20, 4)
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNone(data["next"])
+        self.assertIn("page=3", data["previous"])
+        data = self.page(20, 8)
+        self.assertEqual(data["results"], [])
+        self.assertIsNone(data["next"])
+
+    def test_page_numbers_below_one_are_not_found(self):
+        with mock.patch("api.pagination.estimated_count", return_value=20):
+            for number in (0, -1, "x"):
+                response = client_for().get(URL, {"page": number})
+                self.assertEqual(response.status_code, 404)
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "estimates need PostgreSQL"
+)
+class WarmListQueriesTest(TestCase):
+    def test_table_estimate_is_cached(self):
+        author = create_user("author")
+        for index in range(3):
+            create_recipe(author, f"Рецепт {index}")
+        client_for().get(URL)
+        # the count and the page, rendered from cached fragments.
+        with self.assertNumQueries(2):
+            response = client_for().get(URL)
+        self.assertEqual(response.json()["count"], 3)
+        self.assertEqual(response["X-Count-Exact"], "true")
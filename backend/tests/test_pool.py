@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+from psycopg2 import extensions
+
+from foodgram.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """the part of a psycopg2 connection the pool uses."""
+
+    autocommit = False
+
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = 1
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+
+def make_pool(**options):
+    created = []
+
+    def factory():
+        created.append(FakeConnection())
+        return created[-1]
+
+    pool = ConnectionPool(factory, **{"min_size": 0, **options})
+    return pool, created
+
+
+def test_returned_connection_is_reused_clean():
+    pool, created = make_pool()
+    connection = pool.getconn()
+    connection.status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(connection)
+    assert connection.rollbacks == 1
+    assert pool.getconn() is connection
+    stats = pool.stats()
+    assert (stats["created"], stats["checkouts"], stats["in_use"]) == (1, 2, 1)
+
+
+def test_exhausted_pool_times_out():
+    pool, _ = make_pool(max_size=1, timeout=0.05)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_waiter_gets_returned_connection():
+    pool, _ = make_pool(max_size=1, timeout=5)
+    connection = pool.getconn()
+    timer = threading.Timer(0.05, pool.putconn, (connection,))
+    timer.start()
+    assert pool.getconn() is connection
+    timer.join()
+    assert pool.stats()["waits"] == 1
+
+
+def test_connection_of_ended_thread_is_reclaimed():
+    pool, created = make_pool(max_size=1, timeout=0.05)
+    thread = threading.Thread(target=pool.getconn)
+    thread.start()
+    thread.join()
+    connection = pool.getconn()
+    assert connection is created[1]
+    assert created[0].closed
+    assert pool.stats()["reclaimed"] == 1
+
+
+def test_fork_drops_inherited_connections_unclosed():
+    pool, created = make_pool(min_size=1)
+    borrowed = pool.getconn()
+    # as if forked: the pool belongs to another process now.
+    pool._pid = -1
+    connection = pool.getconn()
+    assert connection is created[1]
+    assert not borrowed.closed
+    assert (pool.stats()["size"], pool.stats()["in_use"]) == (1, 1)
+
+
+def test_closeall_closes_borrowed_connections():
+    pool, created = make_pool()
+    borrowed, idle = pool.getconn(), pool.getconn()
+    pool.putconn(idle)
+    pool.closeall()
+    assert borrowed.closed and idle.closed
+    assert pool.stats()["size"] == 0
+    pool.putconn(borrowed)
+    assert pool.stats()["size"] == 0
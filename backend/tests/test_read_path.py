@@ -0,0 +1,102 @@
+import pytest
+from django.core.cache import caches
+
+from api.fragments import fragment_key
+from recipes.models import (FavoriteRecipe, Recipe, ShoppingCart,
+                            Subscription)
+from tests.utils import (client_for, create_ingredient, create_recipe,
+                         create_tag, create_user)
+
+SERIALIZER = {"FAST_READ_PATH": False, "RECIPE_FRAGMENTS": False}
+READERS = {
+    "values": {"FAST_READ_PATH": True, "RECIPE_FRAGMENTS": False},
+    "fragments": {"FAST_READ_PATH": True, "RECIPE_FRAGMENTS": True},
+}
+
+
+@pytest.fixture
+def reader(db):
+    return create_user("reader")
+
+
+@pytest.fixture
+def author(db):
+    return create_user("author")
+
+
+@pytest.fixture
+def followed(reader):
+    author = create_user("followed")
+    Subscription.objects.create(user=reader, following=author)
+    return author
+
+
+@pytest.fixture
+def recipes(reader, author, followed):
+    salt = create_ingredient("Соль")
+    pepper = create_ingredient("Перец", "щепотка")
+    lunch, dinner = create_tag("lunch"), create_tag("dinner")
+    plain = create_recipe(author, "Простой", [(salt, 5)], [lunch])
+    favorite = create_recipe(
+        author, "Избранный", [(salt, 1), (pepper, 2)], [lunch, dinner]
+    )
+    in_cart = create_recipe(followed, "В корзине", [(pepper, 3)], [dinner])
+    FavoriteRecipe.objects.create(user=reader, recipe=favorite)
+    ShoppingCart.objects.create(user=reader, recipe=in_cart)
+    return [plain, favorite, in_cart]
+
+
+def get(settings, user, path, overrides):
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    response = client_for(user).get(path)
+    return response.status_code, response.content
+
+
+def paths(recipes):
+    return [
+        "/api/recipes/",
+        "/api/recipes/?is_favorited=1",
+        "/api/recipes/?is_in_shopping_cart=1",
+        "/api/recipes/?fields=id,is_favorited,is_in_shopping_cart",
+    ] + [f"/api/recipes/{recipe.pk}/" for recipe in recipes]
+
+
+@pytest.mark.parametrize("mode", READERS)
+@pytest.mark.parametrize("anonymous", (True, False), ids=("anonymous", "user"))
+def test_readers_render_serializer_bytes(
+    settings, reader, recipes, mode, anonymous
+):
+    user = None if anonymous else reader
+    for path in paths(recipes):
+        expected = get(settings, user, path, SERIALIZER)
+        assert expected[0] == 200, path
+        # fragments are compared cold and then from the cache.
+        for _ in range(2):
+            assert get(settings, user, path, READERS[mode]) == expected, path
+
+
+@pytest.mark.parametrize("mode", READERS)
+def test_subscriptions_render_serializer_bytes(
+    settings, reader, recipes, mode
+):
+    path = "/api/users/subscriptions/"
+    expected = get(settings, reader, path, SERIALIZER)
+    assert expected[0] == 200
+    assert get(settings, reader, path, READERS[mode]) == expected
+
+
+def test_fragments_are_cached_without_images(settings, recipes):
+    get(settings, None, "/api/recipes/", READERS["fragments"])
+    cache = caches[settings.RECIPE_FRAGMENT_CACHE]
+    # single_flight entries are (value, delta, expires_at).
+    entries = cache.get_many(
+        [
+            fragment_key(pk, version)
+            for pk, version in Recipe.objects.values_list("pk", "version")
+        ]
+    )
+    assert len(entries) == len(recipes)
+    for fragment, _, _ in entries.values():
+        assert b'"image":null' in fragment
+        assert b"base64" not in fragment
@@ -0,0 +1,93 @@
+import os
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from recipes.similarity import (PRIME, SimilarityIndex, recipe_features,
+                                signature)
+from tests.utils import (create_ingredient, create_recipe, create_tag,
+                         create_user)
+
+
+def test_signature_depends_on_the_feature_set_only():
+    assert (signature([1, 2, 3], [4]) == signature([3, 1, 2], [4])).all()
+    # tags and ingredients of one id are different features.
+    assert not (signature([4], []) == signature([], [4])).all()
+    assert (signature([], []) == PRIME).all()
+
+
+def test_signature_agreement_estimates_jaccard():
+    shared = list(range(100))
+    half = signature(shared, []) == signature(shared[:50] + [500], [])
+    unrelated = signature(shared, []) == signature(range(200, 300), [])
+    assert 0.3 < half.mean() < 0.7
+    assert unrelated.mean() < 0.1
+
+
+@pytest.fixture
+def index(db, settings, media_root):
+    settings.SIMILARITY_SYNC_INTERVAL = 0
+    return SimilarityIndex(media_root / "index")
+
+
+@pytest.fixture
+def recipes(db):
+    author = create_user("author")
+    ingredients = [create_ingredient(f"Ингредиент {i}") for i in range(12)]
+    lunch = create_tag("lunch")
+
+    def recipe(name, indexes):
+        pairs = [(ingredients[i], 1) for i in indexes]
+        return create_recipe(author, name, pairs, [lunch]).pk
+
+    return {
+        "soup": recipe("Суп", range(8)),
+        "twin": recipe("Почти суп", list(range(7)) + [8]),
+        "other": recipe("Другое", range(9, 12)),
+    }
+
+
+def test_lsh_finds_the_near_duplicate(index, recipes):
+    assert index.build() == 3
+    similar = index.similar(recipes["soup"], 5)
+    assert similar[0][0] == recipes["twin"]
+    assert recipes["soup"] not in dict(similar)
+    assert dict(similar).get(recipes["other"], 0) < similar[0][1]
+
+
+def test_build_swaps_current_and_keeps_the_previous(index, recipes):
+    names = []
+    for _ in range(3):
+        index.build()
+        with open(os.path.join(index.root, "CURRENT")) as file:
+            names.append(file.read())
+    builds = sorted(
+        name for name in os.listdir(index.root) if name.startswith("build-")
+    )
+    assert builds == names[1:]
+
+    reader = SimilarityIndex(index.root)
+    reader.refresh()
+    assert reader._build == names[2]
+
+
+def test_delta_reaches_other_workers_and_is_loaded_once(index, recipes):
+    index.build()
+    worker = SimilarityIndex(index.root)
+    worker.refresh()
+    # saved with the ingredients and tags of the soup.
+    _, ingredient_ids, tag_ids = next(recipe_features([recipes["soup"]]))
+    index.update(recipes["other"], ingredient_ids, tag_ids)
+
+    with mock.patch("recipes.similarity.np.load", wraps=np.load) as load:
+        worker.refresh()
+        assert recipes["other"] in dict(worker.similar(recipes["soup"], 5))
+        loaded = load.call_count
+        worker.refresh()
+        assert load.call_count == loaded
+
+    # merged by the next build and dropped from delta/.
+    index.build()
+    worker.refresh()
+    assert worker._delta == {}
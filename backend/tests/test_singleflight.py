@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from api.singleflight import SingleFlight
+
+CALLERS = 100
+
+
+@pytest.mark.parametrize(
+    "processes", (1, 4), ids=("one process", "four processes")
+)
+def test_concurrent_misses_compute_once(processes):
+    # a SingleFlight per simulated process: those share only the cache.
+    flights = [SingleFlight() for _ in range(processes)]
+    cache = LocMemCache("single-flight-test", {})
+    # locmem caches of one name share their data.
+    cache.clear()
+    calls = []
+    barrier = threading.Barrier(CALLERS)
+    results = [None] * CALLERS
+    errors = []
+
+    def load():
+        calls.append(threading.get_ident())
+        time.sleep(0.3)
+        return {"calls": len(calls), "rows": list(range(10))}
+
+    def call(index):
+        try:
+            barrier.wait()
+            results[index] = flights[index % processes].get(
+                cache, "key", load, 60
+            )
+        except Exception as error:
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=call, args=(index,))
+        for index in range(CALLERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(calls) == 1
+    assert results == [{"calls": 1, "rows": list(range(10))}] * CALLERS
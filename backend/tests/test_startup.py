@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+
+# apps removed from INSTALLED_APPS; none of the API uses them.
+UNUSED = ("djoser", "rest_framework_simplejwt", "social_django")
+MARKER = "-- sys.modules --"
+TARGETS = {
+    "check": (
+        "import runpy; sys.argv = ['manage.py', 'check']; "
+        "runpy.run_path('manage.py', run_name='__main__')"
+    ),
+    "wsgi": "import foodgram.wsgi",
+}
+
+
+def loaded_packages(code):
+    """top-level packages in sys.modules after a cold start running code."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; {code}; print({MARKER!r}, *sys.modules, sep='\\n')",
+        ],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    modules = result.stdout.split(MARKER, 1)[1].split()
+    return {name.split(".")[0] for name in modules}
+
+
+@pytest.mark.parametrize("target", TARGETS)
+def test_cold_start_skips_removed_apps(target):
+    # timings flake on shared runners; importtime --budget-ms measures.
+    loaded = loaded_packages(TARGETS[target])
+    assert "django" in loaded
+    assert loaded.isdisjoint(UNUSED), sorted(loaded.intersection(UNUSED))
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from api.throttling import LocalStore, RedisStore
+
+# a Redis the tests may write to, e.g. redis://127.0.0.1:6379/15.
+REDIS = os.getenv("TEST_REDIS_LOCATION")
+THREADS = 8
+UPDATES = 50
+
+
+def increment(value):
+    value = (value or 0) + 1
+    return value, time.time() + 60, value
+
+
+def assert_atomic(store, key):
+    """concurrent updates of one key must all count."""
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def run():
+        try:
+            barrier.wait()
+            for _ in range(UPDATES):
+                store.update(key, increment)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    total = store.update(key, lambda value: (value, time.time() + 60, value))
+    assert total == THREADS * UPDATES
+
+
+def test_local_store_updates_are_atomic():
+    assert_atomic(LocalStore(), "key")
+
+
+def test_local_store_forgets_expired_state():
+    store = LocalStore()
+    store.update("key", lambda value: (1, time.time() - 1, None))
+    assert store.update("key", increment) == 1
+
+
+@pytest.mark.skipif(REDIS is None, reason="TEST_REDIS_LOCATION is not set")
+def test_redis_store_updates_are_atomic(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        "throttle-test": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS,
+        },
+    }
+    settings.THROTTLE_CACHE = "throttle-test"
+    store = RedisStore()
+    key = f"test:{uuid.uuid4().hex}"
+    try:
+        assert_atomic(store, key)
+        assert 0 < store.client.pttl(store.PREFIX + key) <= 60000
+    finally:
+        store.client.delete(store.PREFIX + key)
@@ -0,0 +1,103 @@
+import threading
+import unittest
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from recipes.models import FavoriteRecipe, ShoppingCart, Subscription
+from tests.utils import client_for, create_recipe, create_user
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "concurrent writes need PostgreSQL"
+)
+class ToggleRaceTest(TransactionTestCase):
+    """many threads adding and removing the same (user, object) pair."""
+
+    THREADS = 16
+
+    def setUp(self):
+        self.user = create_user("reader")
+        self.author = create_user("author")
+        self.recipe = create_recipe(self.author)
+
+    def race(self, method, url):
+        """status codes of THREADS simultaneous requests, sorted."""
+        barrier = threading.Barrier(self.THREADS)
+        statuses, errors = [], []
+
+        def request():
+            client = client_for(self.user)
+            barrier.wait()
+            try:
+                statuses.append(getattr(client, method)(url).status_code)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=request) for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return sorted(statuses)
+
+    def assert_toggles(self, url, rows):
+        self.assertEqual(
+            self.race("post", url), [201] + [400] * (self.THREADS - 1)
+        )
+        self.assertEqual(rows.count(), 1)
+        self.assertEqual(
+            self.race("delete", url), [204] + [400] * (self.THREADS - 1)
+        )
+        self.assertEqual(rows.count(), 0)
+
+    def test_favorite(self):
+        self.assert_toggles(
+            f"/api/recipes/{self.recipe.pk}/favorite/",
+            FavoriteRecipe.objects.filter(user=self.user, recipe=self.recipe),
+        )
+
+    def test_shopping_cart(self):
+        self.assert_toggles(
+            f"/api/recipes/{self.recipe.pk}/shopping_cart/",
+            ShoppingCart.objects.filter(user=self.user, recipe=self.recipe),
+        )
+
+    def test_subscribe(self):
+        self.assert_toggles(
+            f"/api/users/{self.author.pk}/subscribe/",
+            Subscription.objects.filter(
+                user=self.user, following=self.author
+            ),
+        )
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "the budget is PostgreSQL's"
+)
+class ToggleQueriesTest(TestCase):
+    """a toggle reads the recipe, writes its row and logs the change."""
+
+    # the outer SAVEPOINT and RELEASE stand in for BEGIN and COMMIT.
+    QUERIES = 5
+
+    def setUp(self):
+        self.client = client_for(create_user("reader"))
+        self.recipe = create_recipe(create_user("author"))
+
+    def assert_queries(self, url):
+        for method, status in (("post", 201), ("delete", 204)):
+            with self.assertNumQueries(self.QUERIES):
+                response = getattr(self.client, method)(url)
+            self.assertEqual(response.status_code, status)
+
+    def test_favorite(self):
+        self.assert_queries(f"/api/recipes/{self.recipe.pk}/favorite/")
+
+    def test_shopping_cart(self):
+        self.assert_queries(f"/api/recipes/{self.recipe.pk}/shopping_cart/")
@@ -0,0 +1,58 @@
+import base64
+
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag, User
+
+# 1x1 PNG stored as the image of every recipe made by create_recipe.
+IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGM4EaABAAMkAU"
+    "EdGZ/EAAAAAElFTkSuQmCC"
+)
+IMAGE_NAME = "recipe.png"
+
+
+def create_user(username, **fields):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="password",
+        first_name=fields.pop("first_name", username.title()),
+        last_name=fields.pop("last_name", "Тестов"),
+        **fields,
+    )
+
+
+def create_tag(slug):
+    return Tag.objects.create(name=slug.title(), slug=slug)
+
+
+def create_ingredient(name, measurement_unit="г"):
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit
+    )
+
+
+def create_recipe(author, name="Рецепт", ingredients=(), tags=(), **fields):
+    """recipe with (ingredient, amount) pairs and tags."""
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        image=IMAGE_NAME,
+        text=fields.pop("text", "Описание"),
+        cooking_time=fields.pop("cooking_time", 10),
+        **fields,
+    )
+    for ingredient, amount in ingredients:
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+    recipe.tags.set(tags)
+    return recipe
+
+
+def client_for(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client